@@ -0,0 +1,379 @@
+"""
+benchmark.py
+
+Reproducible benchmarks for training, inference and the PawIdentify request path.
+Everything runs on synthetic JPEGs and random weights, so no dataset or trained model is needed.
+Features:
+- Pipeline: `make_dataset` images/sec across num_parallel_calls/prefetch settings.
+- Model: forward-pass latency and images/sec of `build_enhanced_model` across batch sizes.
+- Preprocess: latency of the app's draft-mode `preprocess_image` across input resolutions versus
+  the original full-decode LANCZOS path, with pixel deviation and (when a model is present) top-1 agreement.
+- Lookup: `lookup_breed_info` lookups/sec over every classes.txt name.
+- Chat: queries/sec of `generate_chat_response` versus the original keyword-scan engine.
+- Rerun: server time and payload (element protos plus the media files they reference) of one chat
+  message on the result dashboard, as a full script rerun (the original handling, with the photo
+  re-encoded every run) versus the chat fragment.
+- JSON output (`--output`) and regression check against an earlier run (`--compare`).
+"""
+
+from pathlib import Path
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+CHAT_QUERIES = [
+    "hi", "hello there!", "What should I feed him?", "what does a puppy eat on friday",
+    "where is this breed from?", "tell me about the history", "how long do they live",
+    "is it ok in hot weather", "how often should I brush the coat", "do they shed a lot",
+    "are they easy to train", "how big do they get", "how much do they weigh",
+    "are they good with kids", "how much exercise do they need", "do they bark a lot",
+    "common health problems?", "what colors do they come in", "tell me something interesting",
+]
+PIPELINE_SETTINGS = [  # (num_parallel_calls, prefetch); -1 = tf.data.AUTOTUNE, 0 = no prefetch
+    (1, 0), (1, -1), (4, -1), (-1, 0), (-1, -1),
+]
+MODEL_BATCH_SIZES = [1, 8, 32]
+PREPROCESS_RESOLUTIONS = [(640, 480), (1920, 1080), (4032, 3024)]
+# Times the script body itself (AppTest's own run() polls, so its wall-clock is coarse).
+RERUN_DRIVER = """
+import time
+import streamlit as st
+from streamlit import runtime
+start = time.perf_counter()
+try:
+{body}
+finally:
+    st.session_state.rerun_seconds = time.perf_counter() - start
+    # Image elements only carry a media URL; AppTest gives every run a fresh media store.
+    storage = runtime.get_instance().media_file_mgr._storage
+    st.session_state.media_bytes = sum(f.content_size for f in storage._files_by_id.values())
+"""
+CHAT_BREEDS = ["Siberian Husky", "Pug", "Toy Poodle", "Basenji", "Bernese Mountain Dog", "Unknown Breed"]
+
+
+def legacy_chat_response(knowledge_base, fallback, breed_name, user_query):
+    """
+    The original substring-scan lookup and keyword-chain chat engine, kept as the baseline.
+    """
+    info = knowledge_base.get(breed_name)
+    if info is None:
+        info = next((v for k, v in knowledge_base.items() if k in breed_name or breed_name in k), fallback)
+    query = user_query.lower()
+    if any(word in query for word in ["eat", "food", "diet", "feed", "hungry", "treats"]):
+        return f"🍖 **Dietary Advice:** {info['Diet']}"
+    elif any(word in query for word in ["origin", "from", "country", "history", "where"]):
+        return f"🌍 **Origin:** The {breed_name} originates from {info['Origin']}."
+    elif any(word in query for word in ["live", "life", "age", "years", "old", "die"]):
+        return f"⏳ **Lifespan:** The {breed_name} typically lives for {info['Life Span']}."
+    elif any(word in query for word in ["weather", "cold", "hot", "winter", "summer", "climate", "temp"]):
+        return f"☀️ **Climate Preference:** {info['Climate']}"
+    elif any(word in query for word in ["groom", "brush", "hair", "shed", "fur", "bath"]):
+        return f"🛁 **Grooming:** {info.get('Grooming', 'Regular brushing recommended.')}"
+    elif any(word in query for word in ["train", "sit", "stay", "behavior", "smart", "intelligent"]):
+        return f"🎓 **Training:** {info.get('Training', 'Positive reinforcement works best.')}"
+    elif any(word in query for word in ["big", "small", "size", "height", "weight", "tall"]):
+        return f"📏 **Size:** They typically stand {info.get('Height', 'Varies')} tall."
+    elif any(word in query for word in ["hello", "hi", "hey"]):
+        return f"Woof! I am your {breed_name} expert. Ask me about my diet, health, or history!"
+    else:
+        return f"That's an interesting question about the **{breed_name}**. While I specialize in their biology and care, generally speaking: {info['Bio']}"
+
+
+def legacy_preprocess_image(data, size=(224, 224)):
+    """
+    The original preprocessing: full decode, `ImageOps.fit` with LANCZOS, float copy, expand_dims.
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(io.BytesIO(data)).convert('RGB')
+    img = ImageOps.fit(img, size, Image.LANCZOS)
+    return np.expand_dims(np.asarray(img, dtype=np.float32), axis=0)
+
+
+def synthetic_jpegs(resolutions, quality=90):
+    """
+    Smooth gradient + noise JPEGs, so DCT scaling sees realistic high-frequency content.
+    """
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    images = []
+    for width, height in resolutions:
+        yy, xx = np.mgrid[0:height, 0:width]
+        base = np.stack([xx * 255 / width, yy * 255 / height, (xx + yy) * 127 / (width + height)], axis=-1)
+        pixels = np.clip(base + rng.normal(0, 20, base.shape), 0, 255).astype(np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, format='JPEG', quality=quality)
+        images.append((f"{width}x{height}", buf.getvalue()))
+    return images
+
+
+def measure(fn, calls, min_time=1.0):
+    """
+    Runs `fn` over `calls` until `min_time` seconds have passed; returns calls/sec.
+    """
+    done, start = 0, time.perf_counter()
+    while True:
+        for args in calls:
+            fn(*args)
+        done += len(calls)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return done / elapsed
+
+
+def bench_pipeline(args):
+    import tensorflow as tf
+    from dog_breed_classifier import make_dataset
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, (_, data) in enumerate(synthetic_jpegs([(500, 375)] * args.num_images)):
+            path = Path(tmp) / f'{i}.jpg'
+            path.write_bytes(data)
+            paths.append(str(path))
+        labels = np.zeros(len(paths), dtype=np.int32)
+
+        results = {}
+        for parallel, prefetch in PIPELINE_SETTINGS:
+            ds = make_dataset(paths, labels, shuffle=False, batch_size=32,
+                              num_parallel_calls=parallel if parallel > 0 else tf.data.AUTOTUNE,
+                              prefetch=prefetch if prefetch >= 0 else tf.data.AUTOTUNE)
+            for _ in ds:  # Warm the OS page cache and tf.data's autotuner.
+                pass
+            count, start = 0, time.perf_counter()
+            while time.perf_counter() - start < args.min_time:
+                for images, _ in ds:
+                    count += int(images.shape[0])
+            name = f"parallel={parallel if parallel > 0 else 'auto'},prefetch={prefetch if prefetch >= 0 else 'auto'}"
+            results[name] = {"images_per_sec": count / (time.perf_counter() - start)}
+    return results
+
+
+def bench_model(args):
+    import tensorflow as tf
+    from dog_breed_classifier import build_enhanced_model, build_inference_model
+
+    _, model = build_enhanced_model(120, weights=None)
+    model = build_inference_model(model)
+    forward = tf.function(lambda x: model(x, training=False))
+
+    results = {}
+    for batch_size in MODEL_BATCH_SIZES:
+        batch = tf.random.uniform((batch_size, 224, 224, 3), maxval=255)
+        forward(batch)  # Trace outside the timed loop.
+        batches_per_sec = measure(lambda: forward(batch).numpy(), [()], args.min_time)
+        results[f"batch={batch_size}"] = {
+            "latency_ms": 1e3 / batches_per_sec,
+            "images_per_sec": batches_per_sec * batch_size,
+        }
+    return results
+
+
+def bench_lookup(args):
+    import streamlit_app as app
+
+    with open(app.CLASSES_FILE_PATH) as f:
+        classes = [line.strip() for line in f if line.strip()]
+    display = [c.split('-', 1)[1].replace('_', ' ').title() if '-' in c else c for c in classes]
+    calls = [(name,) for name in classes + display + ["Unknown Breed"]]
+    return {"lookup_qps": measure(app.lookup_breed_info, calls, args.min_time)}
+
+
+def bench_chat(args):
+    import streamlit_app as app
+
+    calls = [(breed, query) for breed in CHAT_BREEDS for query in CHAT_QUERIES]
+    app.generate_chat_response(*calls[0])  # Build the knowledge store outside the timed loop.
+    legacy = lambda breed, query: legacy_chat_response(app.BREED_KNOWLEDGE_BASE, app.FALLBACK_DATA, breed, query)
+    results = {
+        "legacy_qps": measure(legacy, calls, args.min_time),
+        "engine_qps": measure(app.generate_chat_response, calls, args.min_time),
+    }
+    results["speedup"] = results["engine_qps"] / results["legacy_qps"]
+    return results
+
+
+def bench_preprocess(args):
+    import streamlit_app as app
+
+    if args.images:
+        paths = sorted(Path(args.images).glob('*.jpg'))[:args.num_images]
+        images = [(p.name, p.read_bytes()) for p in paths]
+    else:
+        images = synthetic_jpegs(PREPROCESS_RESOLUTIONS)
+
+    buffer = np.empty((1, app.IMG_HEIGHT, app.IMG_WIDTH, 3), dtype=np.float32)
+    results, legacy_batch, fast_batch = {}, [], []
+    for name, data in images:
+        legacy = legacy_preprocess_image(data, (app.IMG_WIDTH, app.IMG_HEIGHT))
+        fast = app.preprocess_image(data, out=buffer).copy()
+        legacy_batch.append(legacy[0])
+        fast_batch.append(fast[0])
+        if not args.images:
+            diff = np.abs(fast - legacy)
+            results[name] = {
+                "legacy_ms": 1e3 / measure(legacy_preprocess_image, [(data,)], args.min_time),
+                "draft_ms": 1e3 / measure(lambda d: app.preprocess_image(d, out=buffer), [(data,)], args.min_time),
+                "mean_abs_pixel_diff": float(diff.mean()),
+                "max_abs_pixel_diff": float(diff.max()),
+            }
+
+    diff = np.abs(np.stack(fast_batch) - np.stack(legacy_batch))
+    results["all"] = {
+        "images": len(images),
+        "legacy_ms": 1e3 / measure(legacy_preprocess_image, [(d,) for _, d in images], args.min_time),
+        "draft_ms": 1e3 / measure(lambda d: app.preprocess_image(d, out=buffer), [(d,) for _, d in images], args.min_time),
+        "mean_abs_pixel_diff": float(diff.mean()),
+        "max_abs_pixel_diff": float(diff.max()),
+    }
+
+    predict_fn, _ = app._build_model_engine({})
+    if predict_fn is not None:
+        legacy_top1 = predict_fn(np.stack(legacy_batch)).argmax(axis=1)
+        fast_top1 = predict_fn(np.stack(fast_batch)).argmax(axis=1)
+        results["all"]["top1_agreement"] = float(np.mean(legacy_top1 == fast_top1))
+    return results
+
+
+def tree_bytes(node):
+    """
+    Serialized size of every element and block proto under an AppTest tree node.
+    """
+    proto = getattr(node, 'proto', None)
+    size = proto.ByteSize() if proto is not None else 0
+    return size + sum(tree_bytes(child) for child in getattr(node, 'children', {}).values())
+
+
+def bench_rerun(args):
+    """
+    One chat message per run, over CHAT_QUERIES, on a result dashboard for a 12 MP upload.
+    """
+    import streamlit_app as app
+    from streamlit.testing.v1 import AppTest
+
+    _, data = synthetic_jpegs([(4032, 3024)])[0]
+    photos = {
+        "pil": app.open_upload(data, 1024),                 # The original session-state photo
+        "jpeg": app.get_display_image("benchmark", data),   # Pre-encoded once per upload
+    }
+
+    def per_message(body, photo):
+        script = Path(tmp) / 'driver.py'
+        script.write_text(RERUN_DRIVER.format(body=body))
+        at = AppTest.from_file(str(script), default_timeout=60)
+        at.session_state.page_view = 'RESULT'
+        at.session_state.session_id = 'benchmark'
+        store = app.get_session_store()
+        store.put('benchmark', 'analysis', {"image": photo, "top_k": [("n02110958-pug", 0.92)], "similar": None})
+        store.put('benchmark', 'chat', {"messages": [{"role": "bot", "content": "Hello!"}], "dropped": 0})
+        at.run()
+        for thread in threading.enumerate():  # Keep the app's background model load out of the timings.
+            if thread.name == 'pawidentify-model-loader':
+                thread.join()
+        seconds, payload = [], []
+        for query in CHAT_QUERIES:
+            at.chat_input[0].set_value(query).run()
+            seconds.append(at.session_state.rerun_seconds)
+            payload.append(tree_bytes(at._tree) + at.session_state.media_bytes)
+        return {"rerun_ms": 1e3 * float(np.median(seconds)), "payload_kb": float(np.median(payload)) / 1e3}
+
+    # Both drive the imported module, so they share its session store with the setup above.
+    full_run = "    import streamlit_app\n    streamlit_app.inject_custom_css()\n    streamlit_app.main()"
+    fragment_run = "    import streamlit_app\n    streamlit_app.render_chat_panel('Pug')"
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "full_rerun_pil_photo": per_message(full_run, photos["pil"]),
+            "full_rerun_jpeg_photo": per_message(full_run, photos["jpeg"]),
+            "fragment_rerun": per_message(fragment_run, photos["jpeg"]),
+        }
+    results["speedup"] = results["full_rerun_pil_photo"]["rerun_ms"] / results["fragment_rerun"]["rerun_ms"]
+    return results
+
+
+SUITES = {
+    "pipeline": bench_pipeline,
+    "model": bench_model,
+    "preprocess": bench_preprocess,
+    "lookup": bench_lookup,
+    "chat": bench_chat,
+    "rerun": bench_rerun,
+}
+
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}/"))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Metrics ending in `_ms` should not grow and `_qps`/`_per_sec` should not shrink
+    by more than `tolerance` (a fraction). Returns [(metric, baseline, current)].
+    """
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    for key, value in current.items():
+        old = previous.get(key)
+        if not old or not value:
+            continue
+        if key.endswith('_ms'):
+            slower = value / old - 1
+        elif key.endswith(('_qps', '_per_sec')):
+            slower = old / value - 1
+        else:
+            continue
+        if slower > tolerance:
+            regressions.append((key, old, value))
+    return regressions
+
+
+def environment():
+    env = {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor()}
+    if 'tensorflow' in sys.modules:
+        env["tensorflow"] = sys.modules['tensorflow'].__version__
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES), default=list(SUITES))
+    parser.add_argument('--min_time', type=float, default=1.0, help="Seconds spent per measurement")
+    parser.add_argument('--images', default=None, help="Directory of .jpg uploads for --suites preprocess (default: synthetic)")
+    parser.add_argument('--num_images', type=int, default=200, help="Max images read from --images / synthetic images for the pipeline suite")
+    parser.add_argument('--output', default=None, help="Also write the JSON results to this file")
+    parser.add_argument('--compare', default=None, help="Earlier --output file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed slowdown before a metric is flagged")
+    args = parser.parse_args()
+
+    results = {name: SUITES[name](args) for name in args.suites}
+    report = {"environment": environment(), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline["results"], args.tolerance)
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: {old:.4g} -> {new:.4g}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against '{args.compare}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+breed_knowledge.py
+
+Indexed breed knowledge store for the PawIdentify app.
+Features:
+- Loads 120_breeds.json and 120_diet_plans.json once into one merged record per breed.
+- Precomputed normalized-name index over classes.txt synset names, bare names,
+  display names and aliases, so every predicted class resolves in O(1).
+- Weekly diet plans exposed per life stage and per weekday.
+- `ChatEngine`, a compiled word-boundary intent matcher over every knowledge field.
+"""
+
+import json
+import os
+import re
+
+LIFE_STAGES = ('puppy', 'adult', 'senior', 'pregnant/nursing')
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# Keys used by the app's curated knowledge base -> 120_breeds.json fields.
+FIELD_ALIASES = {
+    "Group": "Breed Group",
+    "Bio": "Long Description",
+    "Grooming": "Grooming Requirements",
+    "Training": "Training Difficulty",
+}
+
+_SYNSET_PREFIX = re.compile(r'^n\d{8}-')
+
+
+def normalize_breed_name(name):
+    """
+    'n02110185-siberian_husky', 'siberian_husky' and 'Siberian Husky' all map to 'siberian husky'.
+    """
+    name = _SYNSET_PREFIX.sub('', name.strip().lower())
+    return ' '.join(name.replace('_', ' ').replace('-', ' ').split())
+
+
+def _load_json(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class BreedKnowledgeStore:
+    """
+    Immutable breed records plus a normalized-name -> record index.
+    Unknown names resolve to the fallback record.
+    """
+
+    def __init__(self, records, index, fallback):
+        self.records = records
+        self.index = index
+        self.fallback = fallback
+
+    @classmethod
+    def load(cls, breeds_path, diet_plans_path, classes_path=None, curated=None, fallback=None, aliases=None):
+        curated = curated or {}
+        fallback = dict(fallback or {})
+        fallback.setdefault('diet_plan', {})
+        breeds = {normalize_breed_name(b['Breed']): b for b in _load_json(breeds_path)}
+        plans = {normalize_breed_name(p['name']): p['diet_plan'] for p in _load_json(diet_plans_path)}
+        curated_by_key = {normalize_breed_name(k): v for k, v in curated.items()}
+        alias_to_curated = {normalize_breed_name(a): normalize_breed_name(k) for a, k in (aliases or {}).items()}
+
+        class_names = []
+        if classes_path and os.path.exists(classes_path):
+            with open(classes_path, 'r') as f:
+                class_names = [line.strip() for line in f if line.strip()]
+
+        names = {}
+        for raw in class_names + list(breeds) + list(curated):
+            names.setdefault(normalize_breed_name(raw), []).append(raw)
+
+        records, index = [], {}
+        for key, raw_names in names.items():
+            record = dict(fallback)
+            source = breeds.get(key)
+            if source:
+                record.update(source)
+                for legacy, field in FIELD_ALIASES.items():
+                    record[legacy] = source[field]
+            record.update(curated_by_key.get(alias_to_curated.get(key, key), {}))
+            record['diet_plan'] = plans.get(key, {})
+            record['Name'] = key.title()
+
+            index[key] = len(records)
+            for raw in raw_names:
+                index[raw] = len(records)
+                index[raw.lower()] = len(records)
+            records.append(record)
+        return cls(records, index, fallback)
+
+    def lookup(self, breed_name):
+        idx = self.index.get(breed_name)
+        if idx is None:
+            idx = self.index.get(normalize_breed_name(breed_name))
+        return self.records[idx] if idx is not None else self.fallback
+
+    def diet_plan(self, breed_name, stage='adult'):
+        """
+        {weekday: meal} for puppy/adult/senior, {'diet': text} for pregnant/nursing.
+        """
+        return self.lookup(breed_name)['diet_plan'].get(stage, {})
+
+    def diet_for_day(self, breed_name, stage='adult', weekday='monday'):
+        plan = self.diet_plan(breed_name, stage)
+        return plan.get(weekday.lower()) or plan.get('diet')
+
+
+# ------------------------------------------------------------------------------
+# Chat intent engine
+# ------------------------------------------------------------------------------
+
+# (intent, strong keywords, weak keywords). List order breaks score ties.
+INTENT_KEYWORDS = [
+    ("diet", "eat food diet feed hungry treat meal nutrition kibble menu", ""),
+    ("origin", "origin country history native", "from where"),
+    ("lifespan", "lifespan lifetime die", "live life age years old"),
+    ("climate", "weather cold hot winter summer climate temp temperature heat", ""),
+    ("grooming", "groom brush bath", "hair fur"),
+    ("shedding", "shed", ""),
+    ("training", "train obedience behavior behaviour", "sit stay"),
+    ("intelligence", "smart intelligent intelligence clever", ""),
+    ("size", "size height tall", "big small large"),
+    ("weight", "weight weigh heavy", ""),
+    ("colors", "color colour", ""),
+    ("coat", "coat", ""),
+    ("temperament", "temperament personality friendly aggressive kid children family nature", ""),
+    ("exercise", "exercise walk run active energy", "play"),
+    ("barking", "bark noisy loud vocal quiet", ""),
+    ("health", "health disease sick illness vet", "problem"),
+    ("group", "group category", ""),
+    ("scientific", "scientific species latin", ""),
+    ("greeting", "hello hi hey", ""),
+]
+
+STAGE_KEYWORDS = {
+    "puppy": "puppy puppies pup young", "adult": "adult",
+    "senior": "senior elderly aging", "pregnant/nursing": "pregnant nursing lactating",
+}
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def _inflections(word):
+    # Two-letter keywords ("hi") match exactly, so "his"/"history" never hit them.
+    if len(word) <= 2:
+        return {word}
+    forms = {word, word + 's', word + 'es', word + 'ing', word + 'ed'}
+    if word.endswith('e'):
+        forms |= {word[:-1] + 'ing', word + 'd'}
+    if word.endswith('y'):
+        forms.add(word[:-1] + 'ies')
+    if word[-1] not in 'aeiouwy' and word[-2] in 'aeiou':
+        forms |= {word + word[-1] + 'ing', word + word[-1] + 'ed'}
+    return forms
+
+
+def _build_vocabulary():
+    vocabulary = {}
+    for priority, (intent, strong, weak) in enumerate(INTENT_KEYWORDS):
+        for words, weight in ((strong, 2), (weak, 1)):
+            for word in words.split():
+                for form in _inflections(word):
+                    vocabulary.setdefault(form, (intent, weight, priority))
+    return vocabulary
+
+
+def _build_lookup(groups):
+    return {form: key for key, words in groups.items() for word in words.split() for form in _inflections(word)}
+
+
+class ChatEngine:
+    """
+    Rule-based chat over every knowledge field. The query is tokenized once on
+    word boundaries and each token is resolved through a precompiled
+    vocabulary -> (intent, weight) index; the highest-scoring intent answers.
+    """
+
+    VOCABULARY = _build_vocabulary()
+    STAGES = _build_lookup(STAGE_KEYWORDS)
+    DAYS = {day: day for day in WEEKDAYS} | {day[:3]: day for day in WEEKDAYS}
+
+    def classify(self, query):
+        scores, best = {}, None
+        tokens = _TOKEN_RE.findall(query.lower())
+        for token in tokens:
+            hit = self.VOCABULARY.get(token)
+            if hit:
+                intent, weight, priority = hit
+                scores[intent] = scores.get(intent, 0) + weight
+                key = (scores[intent], -priority)
+                if best is None or key > best[0]:
+                    best = (key, intent)
+        return (best[1] if best else None), tokens
+
+    def respond(self, breed_name, query, info, weekday=None):
+        intent, tokens = self.classify(query)
+        get = lambda field, default="I don't have that detail on record.": info.get(field) or default
+
+        if intent == "diet":
+            answer = f"🍖 **Dietary Advice:** {info['Diet']}"
+            plan = info.get('diet_plan') or {}
+            stage = next((self.STAGES[t] for t in tokens if t in self.STAGES), 'adult')
+            day = next((self.DAYS[t] for t in tokens if t in self.DAYS), weekday or WEEKDAYS[0])
+            meals = plan.get(stage, {})
+            meal = meals.get(day) or meals.get('diet')
+            if meal:
+                when = stage.title() if 'diet' in meals else f"{stage.title()} plan for {day.title()}"
+                answer += f"\n\n📅 **{when}:** {meal}"
+            return answer
+        if intent == "origin":
+            return f"🌍 **Origin:** The {breed_name} originates from {info['Origin']}."
+        if intent == "lifespan":
+            return f"⏳ **Lifespan:** The {breed_name} typically lives for {info['Life Span']}."
+        if intent == "climate":
+            return f"☀️ **Climate Preference:** {info['Climate']}"
+        if intent == "grooming":
+            return f"🛁 **Grooming:** {get('Grooming', 'Regular brushing recommended.')}"
+        if intent == "shedding":
+            return f"🧹 **Shedding:** {get('Shedding Level')} — {get('Grooming', 'Regular brushing recommended.')}"
+        if intent == "training":
+            return f"🎓 **Training:** {get('Training', 'Positive reinforcement works best.')}"
+        if intent == "intelligence":
+            return f"🧠 **Intelligence:** {get('Intelligence Level')}"
+        if intent in ("size", "weight"):
+            answer = f"📏 **Size:** They typically stand {get('Height', 'Varies')} tall"
+            return answer + (f" and weigh {info['Weight']}." if info.get('Weight') else ".")
+        if intent == "colors":
+            return f"🎨 **Colors:** {get('Colors')}"
+        if intent == "coat":
+            return f"🐾 **Coat:** {get('Coat Type')}"
+        if intent == "temperament":
+            return f"💛 **Temperament:** {get('Temperament Traits')}"
+        if intent == "exercise":
+            return f"🏃 **Exercise Needs:** {get('Exercise Needs')}"
+        if intent == "barking":
+            return f"🔊 **Barking:** {get('Barking Level')}"
+        if intent == "health":
+            return f"🩺 **Common Health Issues:** {get('Common Diseases')}"
+        if intent == "group":
+            return f"🏷️ **Breed Group:** The {breed_name} belongs to the {info.get('Group', 'Unknown')} group."
+        if intent == "scientific":
+            return f"🔬 **Scientific Name:** {get('Scientific Name', 'Canis lupus familiaris')}"
+        if intent == "greeting":
+            return f"Woof! I am your {breed_name} expert. Ask me about my diet, health, or history!"
+        return f"That's an interesting question about the **{breed_name}**. While I specialize in their biology and care, generally speaking: {info['Bio']}"
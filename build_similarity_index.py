@@ -0,0 +1,118 @@
+"""
+build_similarity_index.py
+
+Offline job that embeds the training set for the Streamlit app's "Similar Dogs" panel.
+Features:
+- Pooled EfficientNet features (the layer feeding the classifier head) for every
+  training image, streamed into a float16 memmap.
+- Writes a `similarity_index.EmbeddingIndex` directory: a normalized float16 matrix the
+  app memory-maps, plus IVF lists (--num_lists, by default about 4*sqrt(N) for galleries
+  over 4096 images, where exact float16 search stops being a few-millisecond scan).
+- Report of build time, index size, and per-query latency and recall@k against exact search.
+"""
+
+from pathlib import Path
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import tensorflow as tf
+
+from dog_breed_classifier import (
+    IMG_SIZE, BATCH_SIZE, verify_dataset, build_image_cache, make_cached_dataset, make_dataset,
+    build_embedding_model,
+)
+from similarity_index import EmbeddingIndex, build_index
+
+IVF_MIN_IMAGES = 4096
+
+
+def model_signature(model_path):
+    stat = os.stat(model_path)
+    return {'path': os.path.basename(model_path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def embed_images(extractor, ds, num_images, out_path):
+    dim = extractor.output.shape[-1]
+    forward = tf.function(lambda images: extractor(images, training=False),
+                          input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32)])
+    feats = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float16, shape=(num_images, dim))
+    offset = 0
+    for images, _ in ds:
+        batch = forward(images).numpy()
+        feats[offset:offset + len(batch)] = batch
+        offset += len(batch)
+        if offset % (50 * len(batch)) < len(batch):
+            print(f"  {offset}/{num_images} images embedded")
+    feats.flush()
+    return np.load(out_path, mmap_mode='r')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_path', default='final_model.keras', help="Trained .keras model (the one the app serves)")
+    parser.add_argument('--output_dir', default='similarity_index', help="Index directory the app loads")
+    parser.add_argument('--num_lists', type=int, default=-1, help="IVF lists (0 = exact search only, -1 = auto)")
+    parser.add_argument('--nprobe', type=int, default=8, help="IVF lists scanned per query in the report")
+    parser.add_argument('--k', type=int, default=6, help="Neighbours per query in the report")
+    parser.add_argument('--num_queries', type=int, default=200, help="Queries used for the latency/recall report")
+    parser.add_argument('--batch_size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--cache_dir', default=None, help="Decoded-image cache shared with dog_breed_classifier.py")
+    args = parser.parse_args()
+
+    paths, labels = verify_dataset(Path('.'))
+    num_lists = args.num_lists
+    if num_lists < 0:
+        num_lists = int(4 * np.sqrt(len(paths))) if len(paths) > IVF_MIN_IMAGES else 0
+
+    extractor = build_embedding_model(tf.keras.models.load_model(args.model_path))
+    index_labels = np.zeros(len(paths), dtype=np.int32)  # Unused by the embedding pass
+    if args.cache_dir:
+        cache = build_image_cache(paths, Path(args.cache_dir))
+        ds = make_cached_dataset(paths, index_labels, cache, shuffle=False, batch_size=args.batch_size)
+    else:
+        ds = make_dataset(paths, index_labels, shuffle=False, batch_size=args.batch_size)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmp:
+        start = time.perf_counter()
+        print(f"Embedding {len(paths)} training images...")
+        feats = embed_images(extractor, ds, len(paths), Path(tmp) / 'raw.npy')
+        embed_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_index(output_dir, feats, paths, labels, num_lists, model_signature(args.model_path))
+        index_seconds = time.perf_counter() - start
+        del feats
+
+    index = EmbeddingIndex.load(output_dir)
+    size = sum(f.stat().st_size for f in output_dir.iterdir() if f.is_file())
+    print(f"✓ Saved '{output_dir}': {len(index)} x {index.embeddings.shape[1]} float16, "
+          f"{num_lists or 'no'} IVF lists, {size / 1e6:.1f} MB "
+          f"(embedding {embed_seconds:.0f}s, indexing {index_seconds:.1f}s).")
+
+    # Report: queries are indexed images; exact search is the reference.
+    exact = EmbeddingIndex(index.embeddings, index.paths, index.labels)
+    rows = np.random.default_rng(0).choice(len(index), min(args.num_queries, len(index)), replace=False)
+    queries = index.embeddings[np.sort(rows)].astype(np.float32)
+
+    def run(idx):
+        start = time.perf_counter()
+        results = [idx.search(q, args.k, args.nprobe)[1] for q in queries]
+        return results, (time.perf_counter() - start) / len(queries)
+
+    exact_rows, exact_latency = run(exact)
+    print(f"\nSearch report ({len(queries)} queries, k={args.k}):")
+    print(f"  {'search':<16} {'ms/query':>9} {'recall@k':>9}")
+    print(f"  {'exact':<16} {exact_latency * 1e3:>9.2f} {1.0:>9.2%}")
+    if num_lists:
+        ivf_rows, ivf_latency = run(index)
+        recall = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(exact_rows, ivf_rows)])
+        print(f"  {f'ivf nprobe={args.nprobe}':<16} {ivf_latency * 1e3:>9.2f} {recall:>9.2%}")
+    print(f"\nServe it with: PAWIDENTIFY_SIMILARITY_INDEX={output_dir} streamlit run streamlit_app.py")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+calibrate_cascade.py
+
+Offline calibration of the Streamlit app's confidence-gated model cascade.
+Features:
+- Runs the cheap model (e.g. student_model.keras from distill_model.py, or a
+  .tflite file) and the full model once over the validation split.
+- Sweeps the cheap model's top-1 confidence threshold and picks the lowest one
+  whose cascade accuracy still meets the target, i.e. the one that lets the
+  cheap path absorb the most traffic.
+- Report of accuracy, absorbed fraction and expected per-image latency at a
+  range of thresholds, plus the environment variables that enable the cascade.
+"""
+
+from pathlib import Path
+import argparse
+import json
+import numpy as np
+import tensorflow as tf
+
+from dog_breed_classifier import (
+    IMG_SIZE, verify_dataset, build_label_mapping, split_train_val,
+    preprocess_image, build_inference_model,
+)
+from quantize_model import TFLiteModel, evaluate, single_image_latency
+
+REPORT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 0.99)
+
+
+def load_predict_fn(model_path):
+    if str(model_path).endswith('.tflite'):
+        return TFLiteModel(model_path).predict
+    model = build_inference_model(tf.keras.models.load_model(model_path))
+    forward = tf.function(lambda images: model(images, training=False),
+                          input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32)])
+    return lambda images: forward(images).numpy()
+
+
+def cascade_outcome(cheap_probs, full_probs, labels, threshold):
+    """
+    (accuracy, absorbed fraction) of the cascade at `threshold`.
+    """
+    absorbed = cheap_probs.max(axis=1) >= threshold
+    top1 = np.where(absorbed, cheap_probs.argmax(axis=1), full_probs.argmax(axis=1))
+    return np.mean(top1 == labels), np.mean(absorbed)
+
+
+def pick_threshold(cheap_probs, full_probs, labels, target_accuracy):
+    """
+    Lowest threshold (most traffic on the cheap path) whose cascade accuracy meets
+    `target_accuracy`. Only the cheap model's observed confidences need checking:
+    between two of them the absorbed set, and so the accuracy, does not change.
+    Returns None when even the full model alone misses the target.
+    """
+    cheap_conf = cheap_probs.max(axis=1)
+    order = np.argsort(-cheap_conf)
+    cheap_correct = (cheap_probs.argmax(axis=1) == labels)[order]
+    full_correct = (full_probs.argmax(axis=1) == labels)[order]
+    # Absorbing the k most confident images: cheap answers for [:k], full for [k:].
+    correct = np.concatenate([[0], np.cumsum(cheap_correct)]) + \
+        np.concatenate([np.cumsum(full_correct[::-1])[::-1], [0]])
+    accuracy = correct / len(labels)
+
+    best = None
+    for k in range(len(labels) + 1):
+        # A threshold can only split between distinct confidences.
+        if 0 < k < len(labels) and cheap_conf[order[k]] == cheap_conf[order[k - 1]]:
+            continue
+        if accuracy[k] >= target_accuracy:
+            best = k
+    if best is None:
+        return None
+    return float(cheap_conf[order[best - 1]]) if best else float(np.nextafter(np.float32(1.0), np.float32(2.0)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cheap_model', default='student_model.keras', help="First-stage model (.keras or .tflite)")
+    parser.add_argument('--full_model', default='final_model.keras', help="Model the uncertain images fall back to")
+    parser.add_argument('--target_accuracy', type=float, default=None, help="Required cascade accuracy on the validation split")
+    parser.add_argument('--max_accuracy_drop', type=float, default=0.01,
+                        help="Without --target_accuracy: allowed drop below the full model's accuracy")
+    parser.add_argument('--num_eval', type=int, default=0, help="Validation images used (0 = all)")
+    parser.add_argument('--output', default='cascade.json', help="Where the chosen threshold and report are written")
+    args = parser.parse_args()
+
+    paths, labels_raw = verify_dataset(Path('.'))
+    label2idx, classes = build_label_mapping(labels_raw)
+    y_indices = [label2idx[l] for l in labels_raw]
+    _, val_paths, _, val_y = split_train_val(paths, y_indices, y_indices)
+    if args.num_eval:
+        val_paths, val_y = val_paths[:args.num_eval], val_y[:args.num_eval]
+    val_y = np.asarray(val_y)
+
+    print(f"Loading {len(val_paths)} validation images...")
+    val_images = np.stack([preprocess_image(p).numpy() for p in val_paths])
+
+    stages = {}
+    for name, path in (('cheap', args.cheap_model), ('full', args.full_model)):
+        predict_fn = load_predict_fn(path)
+        predict_fn(val_images[:1])
+        probs, _ = evaluate(predict_fn, val_images)
+        stages[name] = (probs, single_image_latency(predict_fn, val_images[0]))
+        print(f"✓ {name:<5} {path}: accuracy {np.mean(probs.argmax(axis=1) == val_y):.2%}, "
+              f"{stages[name][1] * 1e3:.2f} ms/img")
+    (cheap_probs, cheap_ms), (full_probs, full_ms) = stages['cheap'], stages['full']
+
+    full_accuracy = np.mean(full_probs.argmax(axis=1) == val_y)
+    target = args.target_accuracy if args.target_accuracy is not None else full_accuracy - args.max_accuracy_drop
+
+    def row(threshold):
+        accuracy, absorbed = cascade_outcome(cheap_probs, full_probs, val_y, threshold)
+        # The cheap model always runs; the full model only for the escalated share.
+        return accuracy, absorbed, cheap_ms + (1 - absorbed) * full_ms
+
+    print(f"\nCascade on {len(val_paths)} validation images (full model alone: {full_accuracy:.2%}, "
+          f"{full_ms * 1e3:.2f} ms/img):")
+    print(f"  {'threshold':>9} {'acc':>7} {'absorbed':>9} {'ms/img@1':>9}")
+    for threshold in REPORT_THRESHOLDS:
+        accuracy, absorbed, latency = row(threshold)
+        print(f"  {threshold:>9.2f} {accuracy:>7.2%} {absorbed:>9.1%} {latency * 1e3:>9.2f}")
+
+    threshold = pick_threshold(cheap_probs, full_probs, val_y, target)
+    if threshold is None:
+        print(f"\n! No threshold reaches {target:.2%}; the full model alone scores {full_accuracy:.2%}.")
+        return
+    accuracy, absorbed, latency = row(threshold)
+    print(f"\n✓ Threshold {threshold:.4f} meets the {target:.2%} target: accuracy {accuracy:.2%}, "
+          f"cheap model answers {absorbed:.1%} of traffic, expected {latency * 1e3:.2f} ms/img "
+          f"({full_ms / latency:.1f}x vs the full model).")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'cheap_model': args.cheap_model, 'full_model': args.full_model,
+            'threshold': threshold, 'target_accuracy': float(target),
+            'accuracy': float(accuracy), 'full_accuracy': float(full_accuracy),
+            'absorbed_fraction': float(absorbed),
+            'cheap_ms': cheap_ms * 1e3, 'full_ms': full_ms * 1e3, 'expected_ms': latency * 1e3,
+            'num_images': len(val_paths),
+        }, f, indent=2)
+    print(f"✓ Saved '{args.output}'.")
+    print(f"\nServe it with: PAWIDENTIFY_CASCADE_MODEL={args.cheap_model} "
+          f"PAWIDENTIFY_CASCADE_THRESHOLD={threshold:.4f} streamlit run streamlit_app.py")
+
+
+if __name__ == '__main__':
+    main()
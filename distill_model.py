@@ -0,0 +1,179 @@
+"""
+distill_model.py
+
+Knowledge distillation of the Dog Breed Classifier into a small, CPU-first student.
+Features:
+- MobileNetV3-Small student trained on the teacher's temperature-softened
+  probabilities (KL divergence) mixed with the hard labels.
+- The student keeps the app's input contract (224x224 RGB, 0-255 floats): a
+  reduced --student_size is handled by a Resizing layer inside the model, and
+  MobileNetV3 applies its own input rescaling.
+- Softmax output over the same classes.txt order, so the saved .keras file is
+  served by the Streamlit app (PAWIDENTIFY_MODEL) and infer.py as-is.
+- Report of student vs teacher accuracy, top-1 agreement, size and per-image
+  latency on the validation split.
+"""
+
+from pathlib import Path
+import argparse
+import os
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+
+from dog_breed_classifier import (
+    IMG_SIZE, BATCH_SIZE, verify_dataset, build_label_mapping, split_train_val,
+    preprocess_image, build_inference_model, build_image_cache, make_cached_dataset,
+    make_dataset, build_augmentation, augment_dataset,
+)
+from quantize_model import evaluate, single_image_latency
+
+STUDENT_SIZE = 224
+
+
+def build_student(num_classes, resolution=STUDENT_SIZE, minimalistic=False, weights="imagenet"):
+    """
+    Returns the student (224x224 input -> float32 probabilities). Its pre-softmax
+    layer is named 'logits' so the distiller can read it.
+    """
+    inputs = layers.Input(shape=(IMG_SIZE, IMG_SIZE, 3))
+    x = inputs
+    if resolution != IMG_SIZE:
+        x = layers.Resizing(resolution, resolution, interpolation="bilinear")(x)
+
+    base_model = tf.keras.applications.MobileNetV3Small(
+        include_top=False,
+        input_tensor=x,
+        weights=weights,
+        minimalistic=minimalistic,
+        pooling="avg",
+        include_preprocessing=True,
+    )
+
+    x = layers.Dropout(0.2)(base_model.output)
+    logits = layers.Dense(num_classes, name="logits")(x)
+    outputs = layers.Activation("softmax", dtype="float32", name="probabilities")(logits)
+    return models.Model(inputs, outputs, name="student")
+
+
+class Distiller(models.Model):
+    """
+    Trains `student` against a frozen `teacher`:
+    loss = alpha * T^2 * KL(teacher_T || student_T) + (1 - alpha) * CE(labels, student).
+    The teacher outputs probabilities, so its tempered distribution is softmax(log(p) / T).
+    """
+
+    def __init__(self, student, teacher, temperature=4.0, alpha=0.9):
+        super().__init__()
+        self.student = student
+        self.student_logits = models.Model(student.input, student.get_layer("logits").output)
+        self.teacher = teacher
+        self.teacher.trainable = False
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def call(self, x, training=False):
+        return self.student_logits(x, training=training)
+
+    def compute_loss(self, x=None, y=None, y_pred=None, sample_weight=None, training=True):
+        t = self.temperature
+        y_pred = tf.cast(y_pred, tf.float32)
+        teacher_probs = tf.cast(self.teacher(x, training=False), tf.float32)
+        soft_targets = tf.nn.softmax(tf.math.log(teacher_probs + 1e-8) / t)
+        student_log_probs = tf.nn.log_softmax(y_pred / t)
+        kl = tf.reduce_sum(soft_targets * (tf.math.log(soft_targets + 1e-8) - student_log_probs), axis=-1)
+        hard = tf.keras.losses.categorical_crossentropy(y, y_pred, from_logits=True)
+        return tf.reduce_mean(self.alpha * t * t * kl + (1.0 - self.alpha) * hard)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teacher_path', default='final_model.keras', help="Trained teacher .keras model")
+    parser.add_argument('--output', default='student_model.keras', help="Where the student is saved")
+    parser.add_argument('--student_size', type=int, default=STUDENT_SIZE, help="Resolution the student runs at (input stays 224)")
+    parser.add_argument('--minimalistic', action='store_true', help="MobileNetV3 without squeeze-excite / hard-swish (faster on CPU)")
+    parser.add_argument('--student_weights', choices=['imagenet', 'none'], default='imagenet', help="Student backbone initialization")
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--learning_rate', type=float, default=1e-3)
+    parser.add_argument('--temperature', type=float, default=4.0, help="Softmax temperature for the soft targets")
+    parser.add_argument('--alpha', type=float, default=0.9, help="Weight of the soft-target loss (1 - alpha for the labels)")
+    parser.add_argument('--batch_size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--cache_dir', default=None, help="Decoded-image cache shared with dog_breed_classifier.py")
+    parser.add_argument('--num_eval', type=int, default=500, help="Validation images used for the report (0 = all)")
+    args = parser.parse_args()
+
+    paths, labels_raw = verify_dataset(Path('.'))
+    label2idx, classes = build_label_mapping(labels_raw)
+    y_indices = [label2idx[l] for l in labels_raw]
+    y_onehot = tf.keras.utils.to_categorical(y_indices, num_classes=len(classes))
+    train_paths, val_paths, train_y, val_y = split_train_val(paths, y_onehot, y_indices)
+
+    teacher = build_inference_model(tf.keras.models.load_model(args.teacher_path))
+    if teacher.output_shape[-1] != len(classes):
+        raise ValueError(f"Teacher predicts {teacher.output_shape[-1]} classes but the dataset has {len(classes)}; "
+                         f"distill on the dataset the teacher was trained on.")
+
+    cache = build_image_cache(paths, Path(args.cache_dir)) if args.cache_dir else None
+
+    def split_dataset(split_paths, split_y, shuffle):
+        if cache:
+            return make_cached_dataset(split_paths, split_y, cache, shuffle=shuffle, batch_size=args.batch_size)
+        return make_dataset(split_paths, split_y, shuffle=shuffle, batch_size=args.batch_size)
+
+    # Augmentation runs in the pipeline, so teacher and student see the same view of each image.
+    train_ds = augment_dataset(split_dataset(train_paths, train_y, True), build_augmentation())
+    val_ds = split_dataset(val_paths, val_y, False)
+    print(f"Classes: {len(classes)} | Train: {len(train_paths)} | Val: {len(val_paths)}")
+
+    student = build_student(len(classes), args.student_size, args.minimalistic,
+                            None if args.student_weights == 'none' else 'imagenet')
+    distiller = Distiller(student, teacher, args.temperature, args.alpha)
+    distiller.compile(optimizer=tf.keras.optimizers.Adam(args.learning_rate), metrics=['accuracy'])
+
+    print(f"\n--- Distilling into MobileNetV3-Small @ {args.student_size}px "
+          f"(T={args.temperature}, alpha={args.alpha}) ---")
+    distiller.fit(
+        train_ds,
+        validation_data=val_ds,
+        epochs=args.epochs,
+        callbacks=[
+            tf.keras.callbacks.EarlyStopping(monitor='val_accuracy', patience=5, restore_best_weights=True),
+            tf.keras.callbacks.ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=2),
+        ],
+    )
+
+    student.save(args.output)
+    print(f"✓ Saved '{args.output}'.")
+
+    # Report on the validation split, through the same 224x224 input both models are served with.
+    eval_paths, eval_y = val_paths, np.asarray(val_y).argmax(axis=1)
+    if args.num_eval:
+        eval_paths, eval_y = eval_paths[:args.num_eval], eval_y[:args.num_eval]
+    print(f"Loading {len(eval_paths)} validation images for the report...")
+    val_images = np.stack([preprocess_image(p).numpy() for p in eval_paths])
+
+    report = []
+    teacher_top1 = None
+    for name, model, path in (('teacher', teacher, args.teacher_path), ('student', student, args.output)):
+        predict = tf.function(lambda images, m=model: m(images, training=False),
+                              input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32)])
+        predict_fn = lambda b, f=predict: f(b).numpy()
+        predict_fn(val_images[:1])  # Trace outside the timed loop.
+        probs, latency = evaluate(predict_fn, val_images)
+        top1 = probs.argmax(axis=1)
+        teacher_top1 = top1 if teacher_top1 is None else teacher_top1
+        report.append((name, os.path.getsize(path), model.count_params(), np.mean(top1 == teacher_top1),
+                       np.mean(top1 == eval_y), latency, single_image_latency(predict_fn, val_images[0])))
+
+    print(f"\nValidation report ({len(eval_paths)} images):")
+    print(f"  {'model':<8} {'size MB':>8} {'params':>10} {'agree':>7} {'acc':>7} {'ms/img@32':>10} {'ms/img@1':>9}")
+    for name, size, params, agree, acc, latency, single in report:
+        print(f"  {name:<8} {size / 1e6:>8.1f} {params:>10,} {agree:>7.2%} {acc:>7.2%} "
+              f"{latency * 1e3:>10.2f} {single * 1e3:>9.2f}")
+    speedup = report[0][6] / report[1][6]
+    print(f"  Student: {speedup:.1f}x faster per image, {report[1][4] - report[0][4]:+.2%} accuracy vs teacher.")
+    print(f"\nServe it with: PAWIDENTIFY_MODEL={args.output} streamlit run streamlit_app.py")
+
+
+if __name__ == '__main__':
+    main()
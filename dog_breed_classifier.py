@@ -7,12 +7,33 @@ Features:
 - Integrated Data Augmentation layers (Rotation, Zoom, Contrast).
 - Label Smoothing to prevent overfitting.
 - EfficientNetB0 backbone.
+- Optional decoded-image cache (--cache_dir) so JPEGs are decoded once, not every epoch.
+- Optional precomputed-embedding fast path (--phase1_embeddings) for Phase 1 head training.
+- Optional mixed precision (--mixed_precision) and XLA compilation (--jit_compile),
+  with a steps/sec throughput report per phase.
+- Optional tf.distribute training (--strategy mirrored / multi_worker) with a local
+  multi-process launcher, per-replica batch scaling and a scaling-efficiency log.
+- Fault-tolerant training: periodic mid-epoch backups of weights, optimizer, phase,
+  epoch and callback state, picked up again with --resume.
+- Optional progressive resizing (--progressive): early epochs train at lower resolution
+  with larger batches and weaker augmentation, the last stage and the saved model at 224.
 """
 
 from pathlib import Path
 import csv
+import hashlib
+import json
+import os
 import argparse
+import platform
+import re
+import shutil
+import socket
+import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from sklearn.model_selection import train_test_split
 import tensorflow as tf
@@ -22,6 +43,7 @@ from tensorflow.keras import layers, models, optimizers
 IMG_SIZE = 224
 BATCH_SIZE = 32
 AUTOTUNE = tf.data.AUTOTUNE
+CACHE_SHARD_SIZE = 1024  # Images per memory-mapped cache shard
 
 def read_labels(labels_csv: Path):
     ids, breeds = [], []
@@ -34,7 +56,52 @@ def read_labels(labels_csv: Path):
             breeds.append(row[1].strip() if len(row) > 1 else '')
     return ids, breeds
 
-def verify_dataset(root: Path):
+def _check_image(path):
+    """
+    Fully decodes one image with the decoder training uses. Returns its manifest entry:
+    dimensions, SHA-1 of the file bytes and the decode error, if any.
+    """
+    entry = {'signature': _file_signature(path), 'width': None, 'height': None, 'sha1': None, 'error': None}
+    try:
+        data = Path(path).read_bytes()
+        entry['sha1'] = hashlib.sha1(data).hexdigest()
+        img = tf.io.decode_image(data, channels=3, expand_animations=False)
+        entry['height'], entry['width'] = int(img.shape[0]), int(img.shape[1])
+    except (OSError, tf.errors.OpError) as e:
+        message = re.sub(r'\{\{.*?\}\}\s*|\s*\[Op:\w+\]', '', str(getattr(e, 'message', None) or e))
+        entry['error'] = f"{e.__class__.__name__}: {message}".splitlines()[0]
+    return entry
+
+def verify_images(filepaths, manifest_path: Path, workers=None):
+    """
+    Decodes every image on a thread pool (TensorFlow decoding and hashing release the GIL)
+    and returns path -> manifest entry. Results persist in `manifest_path`, keyed by
+    (mtime, size), so later runs only re-decode new or changed files.
+    """
+    entries = {}
+    if manifest_path.exists():
+        with manifest_path.open('r') as f:
+            entries = json.load(f)
+    stale = [p for p in filepaths if p not in entries or entries[p]['signature'] != _file_signature(p)]
+
+    if stale:
+        print(f"Verifying {len(stale)} image(s) ({len(filepaths) - len(stale)} unchanged since the last check)...")
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for path, entry in zip(stale, pool.map(_check_image, stale, chunksize=64)):
+                entries[path] = entry
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with tmp_path.open('w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, manifest_path)
+    return {p: entries[p] for p in filepaths}
+
+def verify_dataset(root: Path, check_images=False, drop_bad=False, manifest_path=None, workers=None):
+    """
+    Returns (paths, labels) for the labels.csv ids that have a train/*.jpg. With
+    `check_images`, every image is also decode-checked through `verify_images`
+    (manifest at `manifest_path`, default root/'dataset_manifest.json'); `drop_bad`
+    leaves undecodable files out of the result instead of only reporting them.
+    """
     labels_csv = root / 'labels.csv'
     train_dir = root / 'train'
     
@@ -53,6 +120,23 @@ def verify_dataset(root: Path):
             valid_labels.append(breed)
             
     print(f"✓ Found {len(valid_paths)} valid images.")
+    if not (check_images or drop_bad):
+        return valid_paths, valid_labels
+
+    entries = verify_images(valid_paths, Path(manifest_path or root / 'dataset_manifest.json'), workers)
+    bad = [p for p in valid_paths if entries[p]['error']]
+    hashes = [entries[p]['sha1'] for p in valid_paths if entries[p]['sha1']]
+    print(f"✓ Decode check: {len(valid_paths) - len(bad)} ok, {len(bad)} corrupt, "
+          f"{len(hashes) - len(set(hashes))} duplicate file(s) by content.")
+    for path in bad[:10]:
+        print(f"  ! {path}: {entries[path]['error']}")
+    if len(bad) > 10:
+        print(f"  ! ... and {len(bad) - 10} more")
+    if drop_bad and bad:
+        bad = set(bad)
+        kept = [(p, l) for p, l in zip(valid_paths, valid_labels) if p not in bad]
+        valid_paths, valid_labels = [p for p, _ in kept], [l for _, l in kept]
+        print(f"✓ Dropped {len(bad)} corrupt image(s); {len(valid_paths)} remain.")
     return valid_paths, valid_labels
 
 def build_label_mapping(breeds):
@@ -60,34 +144,195 @@ def build_label_mapping(breeds):
     idx = {c: i for i, c in enumerate(classes)}
     return idx, classes
 
-def preprocess_image(image_path):
-    img = tf.io.read_file(image_path)
-    img = tf.image.decode_jpeg(img, channels=3)
-    img = tf.image.resize(img, [IMG_SIZE, IMG_SIZE])
+def decode_image_bytes(contents, image_size=IMG_SIZE):
+    img = tf.io.decode_image(contents, channels=3, expand_animations=False)
+    img = tf.image.resize(img, [image_size, image_size])
     return img
 
-def make_dataset(filepaths, labels, shuffle=True):
+def split_train_val(paths, y, y_indices, val_split=0.15):
+    # Fixed seed so every tool (training, quantization reports, ...) sees the same validation split.
+    return train_test_split(paths, y, test_size=val_split, stratify=y_indices, random_state=42)
+
+def preprocess_image(image_path, image_size=IMG_SIZE):
+    return decode_image_bytes(tf.io.read_file(image_path), image_size)
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def build_image_cache(filepaths, cache_dir: Path):
+    """
+    Decodes and resizes every image once into sharded uint8 .npy files under
+    `cache_dir`, tracked by a manifest of (source path, mtime, size).
+    Only new or changed sources are re-decoded on later runs.
+    Returns (shards, locations): memory-mapped shard arrays and a
+    path -> (shard, slot) mapping.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / 'manifest.json'
+    manifest = {'img_size': IMG_SIZE, 'num_shards': 0, 'entries': {}}
+    if manifest_path.exists():
+        with manifest_path.open('r') as f:
+            stored = json.load(f)
+        if stored.get('img_size') == IMG_SIZE:
+            manifest = stored
+
+    old_entries = manifest['entries']
+    entries, stale = {}, []
+    for path in filepaths:
+        entry = old_entries.get(path)
+        signature = _file_signature(path)
+        if entry and entry['signature'] == signature:
+            entries[path] = entry
+        else:
+            stale.append((path, signature))
+
+    # Slots of changed or removed sources are reused before new shards are added.
+    used = {(e['shard'], e['slot']) for e in entries.values()}
+    free = [(s, i) for s in range(manifest['num_shards']) for i in range(CACHE_SHARD_SIZE) if (s, i) not in used]
+    num_shards = manifest['num_shards']
+    while len(free) < len(stale):
+        free.extend((num_shards, i) for i in range(CACHE_SHARD_SIZE))
+        num_shards += 1
+
+    shard_shape = (CACHE_SHARD_SIZE, IMG_SIZE, IMG_SIZE, 3)
+    for s in range(num_shards):
+        shard_path = cache_dir / f'shard_{s:05d}.npy'
+        if not shard_path.exists():
+            np.lib.format.open_memmap(shard_path, mode='w+', dtype=np.uint8, shape=shard_shape).flush()
+
+    if stale:
+        print(f"Caching {len(stale)} image(s) into '{cache_dir}' ({len(entries)} already cached)...")
+        writable = {}
+        ds = tf.data.Dataset.from_tensor_slices([path for path, _ in stale])
+        ds = ds.map(lambda x: tf.cast(tf.round(tf.clip_by_value(preprocess_image(x), 0, 255)), tf.uint8),
+                    num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+        for (path, signature), (s, i), img in zip(stale, free, ds.as_numpy_iterator()):
+            if s not in writable:
+                writable[s] = np.load(cache_dir / f'shard_{s:05d}.npy', mmap_mode='r+')
+            writable[s][i] = img
+            entries[path] = {'signature': signature, 'shard': s, 'slot': i}
+        for shard in writable.values():
+            shard.flush()
+
+    if stale or entries.keys() != old_entries.keys():
+        # Per-process temp name: concurrent callers must never share (and truncate) one temp file.
+        manifest = {'img_size': IMG_SIZE, 'num_shards': num_shards, 'entries': entries}
+        with tempfile.NamedTemporaryFile('w', dir=cache_dir, suffix='.tmp', delete=False) as f:
+            json.dump(manifest, f)
+        os.replace(f.name, manifest_path)
+
+    shards = [np.load(cache_dir / f'shard_{s:05d}.npy', mmap_mode='r') for s in range(num_shards)]
+    locations = {path: (e['shard'], e['slot']) for path, e in entries.items()}
+    print(f"✓ Image cache ready: {len(locations)} images in {num_shards} shard(s).")
+    return shards, locations
+
+def open_image_cache(filepaths, cache_dir: Path, timeout=3600, poll_seconds=5):
+    """
+    Read-only view of a cache built by another process (the multi-worker launcher or
+    chief). Waits until its manifest covers every path at its current (mtime, size),
+    then memory-maps the shards. Returns the same (shards, locations) as `build_image_cache`.
+    """
+    manifest_path = cache_dir / 'manifest.json'
+    deadline = time.monotonic() + timeout
+    while True:
+        if manifest_path.exists():
+            with manifest_path.open('r') as f:
+                manifest = json.load(f)  # Written with os.replace, so never partial
+            entries = manifest['entries']
+            if manifest.get('img_size') == IMG_SIZE and all(
+                    p in entries and entries[p]['signature'] == _file_signature(p) for p in filepaths):
+                break
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"'{manifest_path}' did not cover the dataset within {timeout}s")
+        time.sleep(poll_seconds)
+
+    shards = [np.load(cache_dir / f'shard_{s:05d}.npy', mmap_mode='r') for s in range(manifest['num_shards'])]
+    locations = {path: (e['shard'], e['slot']) for path, e in entries.items()}
+    print(f"✓ Opened image cache read-only: {len(locations)} images in {len(shards)} shard(s).")
+    return shards, locations
+
+def make_cached_dataset(filepaths, labels, cache, shuffle=True, batch_size=BATCH_SIZE, shard=None,
+                        image_size=IMG_SIZE):
+    """
+    Same batches as `make_dataset`, read from a `build_image_cache` result.
+    Only (shard, slot) indices are shuffled, so the whole split fits in the shuffle buffer.
+    Cached images are IMG_SIZE; a smaller `image_size` is resized per batch.
+    """
+    shards, locations = cache
+    locs = np.array([locations[p] for p in filepaths], dtype=np.int32)
+
+    def gather(batch_locs):
+        return np.stack([shards[s][i] for s, i in batch_locs])
+
+    def load(batch_locs, y):
+        imgs = tf.numpy_function(gather, [batch_locs], tf.uint8)
+        imgs.set_shape([None, IMG_SIZE, IMG_SIZE, 3])
+        imgs = tf.cast(imgs, tf.float32)
+        if image_size != IMG_SIZE:
+            imgs = tf.image.resize(imgs, [image_size, image_size])
+        return imgs, y
+
+    ds = tf.data.Dataset.from_tensor_slices((locs, labels))
+    if shard:
+        ds = ds.shard(*shard)
+    if shuffle:
+        ds = ds.shuffle(len(filepaths))
+    ds = ds.batch(batch_size).map(load, num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+def make_dataset(filepaths, labels, shuffle=True, batch_size=BATCH_SIZE,
+                 num_parallel_calls=AUTOTUNE, prefetch=AUTOTUNE, shard=None, image_size=IMG_SIZE):
+    """
+    Decoded (image, label) batches resized to `image_size`. `shard=(num_shards, index)` keeps
+    every num_shards-th file before decoding, so each input pipeline only decodes its own share.
+    """
     ds = tf.data.Dataset.from_tensor_slices((filepaths, labels))
-    ds = ds.map(lambda x, y: (preprocess_image(x), y), num_parallel_calls=AUTOTUNE)
+    if shard:
+        ds = ds.shard(*shard)
+    ds = ds.map(lambda x, y: (preprocess_image(x, image_size), y), num_parallel_calls=num_parallel_calls)
     if shuffle:
         ds = ds.shuffle(1024)
-    ds = ds.batch(BATCH_SIZE).prefetch(AUTOTUNE)
+    ds = ds.batch(batch_size)
+    if prefetch:
+        ds = ds.prefetch(prefetch)
     return ds
 
-def build_enhanced_model(num_classes):
-    inputs = layers.Input(shape=(IMG_SIZE, IMG_SIZE, 3))
+def build_augmentation(strength=1.0):
+    return [
+        layers.RandomFlip("horizontal"),
+        layers.RandomRotation(0.15 * strength),
+        layers.RandomZoom(0.1 * strength),
+        layers.RandomContrast(0.1 * strength),
+    ]
+
+def augment_dataset(ds, augmentation):
+    """
+    Applies the augmentation layers inside the input pipeline instead of the model.
+    """
+    def apply(x, y):
+        for layer in augmentation:
+            x = layer(x, training=True)
+        return x, y
+    return ds.map(apply, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+
+def build_enhanced_model(num_classes, augment=True, weights="imagenet", input_size=IMG_SIZE):
+    # input_size=None accepts any resolution (progressive resizing).
+    inputs = layers.Input(shape=(input_size, input_size, 3))
     
     # 1. Integrated Augmentation for Robustness
-    x = layers.RandomFlip("horizontal")(inputs)
-    x = layers.RandomRotation(0.15)(x)
-    x = layers.RandomZoom(0.1)(x)
-    x = layers.RandomContrast(0.1)(x)
+    # (augment=False leaves it to the input pipeline, e.g. for XLA, which
+    # cannot compile RandomRotation/RandomZoom.)
+    x = inputs
+    if augment:
+        for layer in build_augmentation():
+            x = layer(x)
     
     # 2. Base Model (EfficientNetB0)
     base_model = tf.keras.applications.EfficientNetB0(
         include_top=False, 
         input_tensor=x, 
-        weights="imagenet"
+        weights=weights
     )
     
     # Freeze base model initially
@@ -98,55 +343,699 @@ def build_enhanced_model(num_classes):
     x = layers.BatchNormalization()(x)
     x = layers.Dropout(0.4)(x)
     
-    outputs = layers.Dense(num_classes, activation="softmax")(x)
+    # Softmax stays in float32 under mixed precision for numerical stability.
+    outputs = layers.Dense(num_classes, activation="softmax", dtype="float32")(x)
     
     model = models.Model(inputs, outputs)
     return base_model, model
 
+AUGMENTATION_LAYERS = (layers.RandomFlip, layers.RandomRotation, layers.RandomZoom, layers.RandomContrast)
+
+def build_inference_model(model):
+    """
+    Returns `model` without its augmentation layers, which are identity ops at inference.
+    """
+    augmenters = [l for l in model.layers if isinstance(l, AUGMENTATION_LAYERS)]
+    if not augmenters:
+        return model
+    return models.Model(augmenters[-1].output, model.output)
+
+def pin_input_size(path, num_classes):
+    """
+    Re-saves a model trained with a variable input size (--progressive) with the fixed
+    IMG_SIZE x IMG_SIZE input the serving tools expect. The weights are unchanged.
+    """
+    trained = tf.keras.models.load_model(path)
+    _, model = build_enhanced_model(num_classes, augment=False, weights=None)
+    model.set_weights(trained.get_weights())
+    model.save(path)
+
+def progressive_schedule(epochs, sizes, batch_size, max_batch_scale=4):
+    """
+    Splits `epochs` into one stage per image size (ascending, ending at IMG_SIZE) as
+    (size, batch_size, augmentation strength, first_epoch, end_epoch). Smaller stages
+    keep pixels per step constant with larger batches (at most `max_batch_scale`x) and
+    use weaker augmentation. Leftover epochs go to the later stages.
+    """
+    sizes = sizes[max(0, len(sizes) - max(epochs, 1)):]
+    n = len(sizes)
+    stages, first = [], 0
+    for i, size in enumerate(sizes):
+        span = epochs // n + (1 if i >= n - epochs % n else 0)
+        scale = min(max_batch_scale, (IMG_SIZE / size) ** 2)
+        strength = 0.5 + 0.5 * i / (n - 1) if n > 1 else 1.0
+        stages.append((size, max(batch_size, int(batch_size * scale)), strength, first, first + span))
+        first += span
+    return stages
+
+def _pooling_index(model):
+    # The last pooling layer feeds the head; earlier ones belong to EfficientNet's squeeze-excite blocks.
+    return max(i for i, l in enumerate(model.layers) if isinstance(l, layers.GlobalAveragePooling2D))
+
+def build_embedding_model(model):
+    """
+    Returns `model` cut at the pooled backbone features (the image embedding used by
+    the similar-dogs index). Its augmentation layers are identity ops at inference.
+    """
+    return models.Model(model.input, model.layers[_pooling_index(model)].output)
+
+def compute_embeddings(model, ds, num_images, out_path: Path, views=1, augmentation=None):
+    """
+    Runs the frozen backbone of `model` over `ds` once per view and stores the
+    pooled features as a float16 (views, num_images, dim) .npy memmap.
+    View 0 is un-augmented; views 1..K-1 pass through `augmentation`
+    (default: the model's own augmentation layers).
+    A matching file from an earlier run (same images, same views) is reused.
+    """
+    pooled = model.layers[_pooling_index(model)]
+    extractor = models.Model(model.input, pooled.output)
+    augmenters = augmentation or [l for l in model.layers if isinstance(l, AUGMENTATION_LAYERS)]
+
+    meta_path = out_path.with_suffix('.json')
+    meta = {'views': views, 'num_images': num_images, 'img_size': IMG_SIZE}
+    if out_path.exists() and meta_path.exists():
+        with meta_path.open('r') as f:
+            if json.load(f) == meta:
+                print(f"✓ Reusing embeddings '{out_path}'.")
+                return np.load(out_path, mmap_mode='r')
+
+    @tf.function
+    def embed(images, augment):
+        if augment:
+            for layer in augmenters:
+                images = layer(images, training=True)
+        return extractor(images, training=False)
+
+    dim = pooled.output.shape[-1]
+    feats = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float16, shape=(views, num_images, dim))
+    for view in range(views):
+        print(f"Embedding view {view + 1}/{views} -> '{out_path}'...")
+        offset = 0
+        for images, _ in ds:
+            batch = embed(images, view > 0).numpy()
+            feats[view, offset:offset + len(batch)] = batch
+            offset += len(batch)
+    feats.flush()
+    with meta_path.open('w') as f:
+        json.dump(meta, f)
+    return np.load(out_path, mmap_mode='r')
+
+def build_head_model(model):
+    """
+    Returns a model from pooled features to class probabilities that shares the
+    BatchNorm/Dropout/Dense layers (and so the weights) of `model`'s head.
+    """
+    idx = _pooling_index(model)
+    feat_in = layers.Input(shape=(model.layers[idx].output.shape[-1],))
+    x = feat_in
+    for layer in model.layers[idx + 1:]:
+        x = layer(x)
+    return models.Model(feat_in, x)
+
+def make_embedding_dataset(feats, labels, shuffle=True, batch_size=BATCH_SIZE):
+    """
+    Yields (feature, label) batches; when shuffling, each epoch draws a random view per image.
+    """
+    feats = tf.constant(np.asarray(feats, dtype=np.float32))
+    views = feats.shape[0]
+    ds = tf.data.Dataset.from_tensor_slices((tf.range(feats.shape[1]), labels))
+    if shuffle:
+        ds = ds.shuffle(feats.shape[1])
+        ds = ds.map(lambda i, y: (feats[tf.random.uniform([], 0, views, dtype=tf.int32), i], y))
+    else:
+        ds = ds.map(lambda i, y: (feats[0, i], y))
+    return ds.batch(batch_size).prefetch(AUTOTUNE)
+
+def _cpu_supports_bfloat16():
+    if platform.system() != 'Linux':
+        return False
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+def configure_mixed_precision(mode):
+    """
+    Sets the global Keras dtype policy. 'auto' picks float16 on GPU,
+    bfloat16 on CPUs with native bf16 support, and float32 otherwise.
+    Must run before the model is built.
+    """
+    if mode == 'auto':
+        if tf.config.list_physical_devices('GPU'):
+            mode = 'float16'
+        elif _cpu_supports_bfloat16():
+            mode = 'bfloat16'
+        else:
+            print("! No native bfloat16 support detected on this CPU; training in float32.")
+            return 'float32'
+    tf.keras.mixed_precision.set_global_policy(f'mixed_{mode}')
+    print(f"✓ Mixed precision policy: mixed_{mode}")
+    return mode
+
+def add_input_probe(ds, ready=None):
+    """
+    Appends a pass-through map that stamps, into the returned variable, the wall-clock
+    time at which each batch is handed to the training step. Without
+    num_parallel_calls and after prefetch, it runs only when the step asks for a batch.
+    """
+    if ready is None:
+        ready = tf.Variable(0.0, dtype=tf.float64, trainable=False)
+
+    def probe(*batch):
+        with tf.control_dependencies([ready.assign(tf.timestamp())]):
+            return tf.nest.map_structure(tf.identity, batch)
+    return ds.map(probe), ready
+
+class ThroughputReport(tf.keras.callbacks.Callback):
+    """
+    Measures training steps/sec for one phase, excluding validation time.
+    The first epoch is reported separately since it includes tracing/compilation.
+    With `input_ready` (from `add_input_probe`), each step is also split into
+    time spent waiting for the input pipeline and compute, printed per epoch.
+    """
+
+    def __init__(self, phase_name, input_ready=None):
+        super().__init__()
+        self.phase_name = phase_name
+        self.input_ready = input_ready
+        self.epoch_rates = []
+        self.epoch_stages = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._steps = 0
+        self._train_time = 0.0
+        self._input_wait = 0.0
+        self._batch_start = None
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._batch_start = time.perf_counter()
+        self._wall_start = time.time()
+
+    def on_train_batch_end(self, batch, logs=None):
+        step = time.perf_counter() - self._batch_start
+        self._train_time += step
+        self._steps += 1
+        if self.input_ready is not None:
+            wait = float(self.input_ready.numpy()) - self._wall_start
+            self._input_wait += min(max(wait, 0.0), step)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if self._train_time > 0:
+            self.epoch_rates.append(self._steps / self._train_time)
+        if self.input_ready is not None and self._train_time > 0:
+            compute = self._train_time - self._input_wait
+            self.epoch_stages.append((self._input_wait, compute))
+            print(f"\n{self.phase_name} epoch {epoch + 1}: input wait {self._input_wait:.1f}s "
+                  f"({self._input_wait / self._train_time:.0%}), compute {compute:.1f}s")
+
+    def steps_per_sec(self):
+        """
+        Mean steps/sec over the epochs after the first (the only epoch if there is one).
+        """
+        steady = self.epoch_rates[1:] or self.epoch_rates
+        return sum(steady) / len(steady) if steady else 0.0
+
+    def summary(self):
+        if not self.epoch_rates:
+            return f"{self.phase_name}: no steps recorded"
+        first = self.epoch_rates[0]
+        if len(self.epoch_rates) == 1:
+            line = f"{self.phase_name}: {first:.2f} steps/sec (1 epoch, includes compilation)"
+        else:
+            line = (f"{self.phase_name}: {self.steps_per_sec():.2f} steps/sec "
+                    f"(first epoch {first:.2f} steps/sec, {len(self.epoch_rates)} epochs)")
+        if self.epoch_stages:
+            stages = self.epoch_stages[1:] or self.epoch_stages
+            wait = sum(w for w, _ in stages)
+            total = wait + sum(c for _, c in stages)
+            line += f", {wait / total:.0%} of step time waiting on input"
+        return line
+
+class ProfilerWindow(tf.keras.callbacks.Callback):
+    """
+    Traces training steps [start, end) of one fit() call with the TensorFlow profiler.
+    Traces land in `log_dir` and open in TensorBoard's Profile tab.
+    """
+
+    def __init__(self, log_dir, start, end):
+        super().__init__()
+        self.log_dir = str(log_dir)
+        self.start, self.end = start, end
+        self._step = 0
+        self._active = False
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self._step == self.start and not self._active:
+            tf.profiler.experimental.start(self.log_dir)
+            self._active = True
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._step += 1
+        if self._active and self._step >= self.end:
+            self._stop()
+
+    def on_train_end(self, logs=None):
+        if self._active:
+            self._stop()
+
+    def _stop(self):
+        tf.profiler.experimental.stop()
+        self._active = False
+        print(f"\n✓ Profiled steps {self.start}-{self.end} into '{self.log_dir}'.")
+
+class _KerasMultiWorkerStrategy(tf.distribute.MultiWorkerMirroredStrategy):
+    """
+    MultiWorkerMirroredStrategy whose `reduce` accepts what Keras 3's fit() passes it:
+    whole (x, y) batches (the base class takes a single value) and scalar logs
+    with axis=0 (which fails on rank-0 values).
+    """
+
+    def reduce(self, reduce_op, value, axis=None):
+        def reduce_one(v):
+            sample = v.values[0] if isinstance(v, tf.distribute.DistributedValues) else tf.convert_to_tensor(v)
+            return super(_KerasMultiWorkerStrategy, self).reduce(reduce_op, v, axis if sample.shape.rank else None)
+        return tf.nest.map_structure(reduce_one, value)
+
+def build_strategy(name, replicas=2):
+    """
+    'mirrored': all local GPUs, or `replicas` logical CPU devices on a CPU-only host.
+    'multi_worker': one replica per process of the TF_CONFIG cluster.
+    Must run before TensorFlow initializes its devices.
+    """
+    if name == 'multi_worker':
+        return _KerasMultiWorkerStrategy()
+    if tf.config.list_physical_devices('GPU'):
+        return tf.distribute.MirroredStrategy()
+    cpu = tf.config.list_physical_devices('CPU')[0]
+    tf.config.set_logical_device_configuration(cpu, [tf.config.LogicalDeviceConfiguration()] * replicas)
+    return tf.distribute.MirroredStrategy([d.name for d in tf.config.list_logical_devices('CPU')])
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+def launch_local_workers(num_workers, threads_per_worker):
+    """
+    Re-runs this command as `num_workers` local processes, each with its own TF_CONFIG
+    (worker 0 is the chief). If one worker fails, the others are stopped.
+    Returns the first non-zero exit code, or 0.
+    """
+    cluster = [f'localhost:{_free_port()}' for _ in range(num_workers)]
+    argv = [sys.executable] + sys.argv + ['--intra_op_threads', str(threads_per_worker)]
+    procs = []
+    for index in range(num_workers):
+        tf_config = {'cluster': {'worker': cluster}, 'task': {'type': 'worker', 'index': index}}
+        procs.append(subprocess.Popen(argv, env=dict(os.environ, TF_CONFIG=json.dumps(tf_config))))
+    print(f"✓ Launched {num_workers} local workers ({threads_per_worker} threads each) on {', '.join(cluster)}")
+
+    while any(p.poll() is None for p in procs):
+        if any(p.poll() for p in procs):
+            for p in procs:
+                if p.poll() is None:
+                    p.terminate()
+        time.sleep(1)
+    return next((p.returncode for p in procs if p.returncode), 0)
+
+def _worker_index():
+    return json.loads(os.environ.get('TF_CONFIG', '{}')).get('task', {}).get('index', 0)
+
+def output_path(name):
+    """
+    `name` on the chief; a per-worker scratch path on the other workers, so every
+    worker runs the same save calls without overwriting the chief's files.
+    """
+    index = _worker_index()
+    if index == 0:
+        return name
+    scratch = Path(tempfile.gettempdir()) / f'dog_breed_worker_{index}'
+    scratch.mkdir(exist_ok=True)
+    return str(scratch / name)
+
+def record_scaling(log_path, strategy_name, replicas, images_per_sec):
+    """
+    Adds this run's images/sec per phase to `log_path` (JSON, keyed by strategy and
+    replica count) and prints the scaling efficiency of every recorded replica count
+    against the smallest one, plus the throughput gained per added replica.
+    """
+    log = json.loads(Path(log_path).read_text()) if Path(log_path).exists() else {}
+    runs = log.setdefault(strategy_name, {})
+    for phase, ips in images_per_sec.items():
+        runs.setdefault(phase, {})[str(replicas)] = ips
+    Path(log_path).write_text(json.dumps(log, indent=2))
+
+    print(f"\nScaling ({strategy_name}, from '{log_path}'):")
+    print(f"  {'phase':<8} {'replicas':>8} {'img/sec':>9} {'efficiency':>11} {'gain/added':>11}")
+    for phase, by_replicas in runs.items():
+        counts = sorted(int(n) for n in by_replicas)
+        base_n, base = counts[0], by_replicas[str(counts[0])]
+        prev_n, prev = base_n, base
+        for n in counts:
+            ips = by_replicas[str(n)]
+            efficiency = ips / (base / base_n * n) if base else 0.0
+            gain = f"{(ips - prev) / (n - prev_n) / (base / base_n):.0%}" if n > prev_n and base else "-"
+            print(f"  {phase:<8} {n:>8} {ips:>9.1f} {efficiency:>11.0%} {gain:>11}")
+            prev_n, prev = n, ips
+
+def record_schedule(log_path, label, stages):
+    """
+    Adds this run's stages (dicts of phase, size, batch, epochs, seconds, images_per_sec,
+    val_accuracy) to `log_path` (JSON, keyed by schedule label, e.g. "224" or
+    "128,160,192,224"), prints them, and compares the total training wall-clock and
+    best Phase 2 validation accuracy of every recorded schedule with the fixed-224 run.
+    """
+    log = json.loads(Path(log_path).read_text()) if Path(log_path).exists() else {}
+    log[label] = stages
+    Path(log_path).write_text(json.dumps(log, indent=2))
+
+    print(f"\nTraining stages ({label}):")
+    print(f"  {'phase':<8} {'size':>5} {'batch':>6} {'epochs':>7} {'seconds':>9} {'img/sec':>9} {'val_acc':>8}")
+    for st in stages:
+        print(f"  {st['phase']:<8} {st['size']:>5} {st['batch']:>6} {st['epochs']:>7} {st['seconds']:>9.1f} "
+              f"{st['images_per_sec']:>9.1f} {st['val_accuracy']:>8.2%}")
+
+    def totals(runs):
+        return (sum(r['seconds'] for r in runs),
+                max((r['val_accuracy'] for r in runs if r['phase'] == 'Phase 2'), default=0.0))
+
+    base = log.get(str(IMG_SIZE))
+    print(f"\nSchedules (from '{log_path}'):")
+    print(f"  {'schedule':<24} {'seconds':>9} {'time':>6} {'val_acc':>8} {'delta':>8}")
+    for name, runs in log.items():
+        seconds, acc = totals(runs)
+        time_vs, acc_vs = "-", "-"
+        if base:
+            base_seconds, base_acc = totals(base)
+            time_vs = f"{seconds / base_seconds:.0%}" if base_seconds else "-"
+            acc_vs = f"{acc - base_acc:+.2%}"
+        print(f"  {name:<24} {seconds:>9.1f} {time_vs:>6} {acc:>8.2%} {acc_vs:>8}")
+
+def _json_number(value):
+    return int(value) if isinstance(value, (int, np.integer)) else float(value)
+
+class PhaseBackup(tf.keras.callbacks.BackupAndRestore):
+    """
+    BackupAndRestore for one training phase that also backs up the counters of
+    `tracked` callbacks (EarlyStopping wait/best and best weights, ReduceLROnPlateau
+    wait/best/cooldown, ModelCheckpoint best), and always backs up at epoch end
+    as well as every `save_freq` batches.
+    Must come after the tracked callbacks, which reset themselves in on_train_begin.
+    """
+
+    FIELDS = (
+        (tf.keras.callbacks.EarlyStopping, ('wait', 'best', 'best_epoch', 'stopped_epoch')),
+        (tf.keras.callbacks.ReduceLROnPlateau, ('wait', 'best', 'cooldown_counter')),
+        (tf.keras.callbacks.ModelCheckpoint, ('best',)),
+    )
+
+    def __init__(self, backup_dir, tracked, save_freq='epoch'):
+        super().__init__(str(backup_dir), save_freq=save_freq, double_checkpoint=True)
+        self.tracked = tracked
+        self._state_path = Path(backup_dir) / 'callbacks.json'
+        self._best_weights_path = Path(backup_dir) / 'best_weights.npz'
+        self._saved_best = None
+
+    def _fields(self, callback):
+        return next((fields for cls, fields in self.FIELDS if isinstance(callback, cls)), ())
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs)
+        if not self._state_path.exists():
+            return
+        state = json.loads(self._state_path.read_text())
+        for i, callback in enumerate(self.tracked):
+            for field, value in state.get(str(i), {}).items():
+                setattr(callback, field, value)
+            if isinstance(callback, tf.keras.callbacks.EarlyStopping) and self._best_weights_path.exists():
+                with np.load(self._best_weights_path) as f:
+                    callback.best_weights = [f[f'arr_{j}'] for j in range(len(f.files))]
+                self._saved_best = callback.best
+        print(f"\n✓ Resumed from '{self.backup_dir}' at epoch {self.model._initial_epoch + 1}.")
+
+    def on_epoch_end(self, epoch, logs=None):
+        super().on_epoch_end(epoch, logs)
+        if self.save_freq != 'epoch':
+            self._save_model()
+
+    def _save_model(self):
+        super()._save_model()
+        state = {}
+        for i, callback in enumerate(self.tracked):
+            values = {f: getattr(callback, f, None) for f in self._fields(callback)}
+            state[str(i)] = {f: _json_number(v) for f, v in values.items() if v is not None}
+            if (isinstance(callback, tf.keras.callbacks.EarlyStopping) and callback.best_weights is not None
+                    and callback.best != self._saved_best):
+                tmp = self._best_weights_path.with_name('best_weights.tmp.npz')
+                np.savez(tmp, *callback.best_weights)
+                os.replace(tmp, self._best_weights_path)
+                self._saved_best = callback.best
+        tmp = self._state_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self._state_path)
+
+def _paths_digest(paths):
+    return hashlib.sha1('\n'.join(paths).encode()).hexdigest()[:12]
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--epochs', type=int, default=12, help="Epochs for initial training")
     parser.add_argument('--fine_tune_epochs', type=int, default=10, help="Epochs for fine tuning")
+    parser.add_argument('--cache_dir', default=None, help="Cache decoded 224x224 images here and reuse them across epochs/runs")
+    parser.add_argument('--verify_images', action='store_true', help="Decode-check every image before training (incremental, parallel)")
+    parser.add_argument('--drop_bad_images', action='store_true', help="Train without the images that fail the decode check")
+    parser.add_argument('--phase1_embeddings', default=None, help="Train Phase 1 on backbone features precomputed into this directory")
+    parser.add_argument('--embedding_views', type=int, default=1, help="Augmented views per training image for --phase1_embeddings")
+    parser.add_argument('--mixed_precision', choices=['auto', 'bfloat16', 'float16'], default=None, help="Train under a mixed-precision policy")
+    parser.add_argument('--jit_compile', action='store_true', help="XLA-compile the training step in both phases")
+    parser.add_argument('--stage_timing', action='store_true', help="Report per-epoch input-wait vs compute time")
+    parser.add_argument('--profile_dir', default=None, help="Write TensorFlow profiler traces (TensorBoard) here")
+    parser.add_argument('--profile_batches', default='10,20', help="START,END step window traced in each phase with --profile_dir")
+    parser.add_argument('--batch_size', type=int, default=BATCH_SIZE, help="Batch size per replica (global = batch_size x replicas)")
+    parser.add_argument('--strategy', choices=['mirrored', 'multi_worker'], default=None, help="tf.distribute strategy")
+    parser.add_argument('--replicas', type=int, default=2, help="Logical CPU replicas for --strategy mirrored without GPUs")
+    parser.add_argument('--workers', type=int, default=2, help="Local processes launched for --strategy multi_worker without TF_CONFIG")
+    parser.add_argument('--intra_op_threads', type=int, default=0, help="TensorFlow intra-op threads (0 = all cores)")
+    parser.add_argument('--scaling_log', default='scaling.json', help="Per-replica-count throughput log for distributed runs")
+    parser.add_argument('--resume', action='store_true', help="Continue an interrupted run from --backup_dir")
+    parser.add_argument('--backup_dir', default='training_backup', help="Where the fault-tolerance backups are written")
+    parser.add_argument('--backup_steps', type=int, default=100, help="Back up every N training steps (and at every epoch end)")
+    parser.add_argument('--progressive', default=None, help="Ascending training resolutions ending at 224, e.g. 128,160,192,224")
+    parser.add_argument('--schedule_log', default=None, help="Per-schedule wall-clock/accuracy log for the training report (default with --progressive: schedule.json)")
     args = parser.parse_args()
+    sizes = [int(size) for size in args.progressive.split(',')] if args.progressive else None
+    if sizes and (sizes[-1] != IMG_SIZE or sizes != sorted(set(sizes))):
+        parser.error(f"--progressive sizes must be ascending and end at {IMG_SIZE}")
+    if args.strategy == 'multi_worker' and args.phase1_embeddings:
+        parser.error("--phase1_embeddings is not supported with --strategy multi_worker")
+    if args.strategy and args.stage_timing:
+        parser.error("--stage_timing measures a single input pipeline; run it without --strategy")
 
     root = Path('.')
-    paths, labels_raw = verify_dataset(root)
+    if args.strategy == 'multi_worker' and 'TF_CONFIG' not in os.environ:
+        # Local launcher: decode the cache once here, then run one process per worker.
+        paths = verify_dataset(root, args.verify_images, args.drop_bad_images)[0]
+        if args.cache_dir:
+            build_image_cache(paths, Path(args.cache_dir))
+        sys.exit(launch_local_workers(args.workers, max(1, (os.cpu_count() or 1) // args.workers)))
+
+    if args.intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(args.intra_op_threads)
+    strategy = build_strategy(args.strategy, args.replicas) if args.strategy else tf.distribute.get_strategy()
+    global_batch = args.batch_size * strategy.num_replicas_in_sync
+    is_chief = _worker_index() == 0
+
+    paths, labels_raw = verify_dataset(root, args.verify_images, args.drop_bad_images)
     
     label2idx, classes = build_label_mapping(labels_raw)
     y_indices = [label2idx[l] for l in labels_raw]
     y_onehot = tf.keras.utils.to_categorical(y_indices, num_classes=len(classes))
     
     # Save classes
-    with open('classes.txt', 'w') as f:
-        f.write('\n'.join(classes))
+    if is_chief:
+        with open('classes.txt', 'w') as f:
+            f.write('\n'.join(classes))
     
     # Stratified Split
-    train_paths, val_paths, train_y, val_y = train_test_split(
-        paths, y_onehot, test_size=0.15, stratify=y_indices, random_state=42
-    )
-    
-    train_ds = make_dataset(train_paths, train_y, shuffle=True)
-    val_ds = make_dataset(val_paths, val_y, shuffle=False)
+    train_paths, val_paths, train_y, val_y = split_train_val(paths, y_onehot, y_indices)
     
+    cache = None
+    if args.cache_dir:
+        # Only the chief (or the local launcher) writes the cache; other workers map it read-only.
+        cache = (build_image_cache if is_chief else open_image_cache)(paths, Path(args.cache_dir))
     print(f"Classes: {len(classes)} | Train: {len(train_paths)} | Val: {len(val_paths)}")
     
     # Build Model
-    base_model, model = build_enhanced_model(len(classes))
+    if args.mixed_precision:
+        configure_mixed_precision(args.mixed_precision)
+    # Progressive stages rebuild the augmentation per stage, so it moves into the pipeline too.
+    pipeline_augmentation = build_augmentation() if args.jit_compile or sizes else None
+    input_ready = tf.Variable(0.0, dtype=tf.float64, trainable=False) if args.stage_timing else None
+
+    def local_dataset(split_paths, split_y, shuffle, batch_size=args.batch_size, shard=None, train=False,
+                      image_size=IMG_SIZE, augmentation=pipeline_augmentation):
+        if cache:
+            ds = make_cached_dataset(split_paths, split_y, cache, shuffle=shuffle, batch_size=batch_size, shard=shard,
+                                     image_size=image_size)
+        else:
+            ds = make_dataset(split_paths, split_y, shuffle=shuffle, batch_size=batch_size, shard=shard,
+                              image_size=image_size)
+        if train and augmentation:
+            ds = augment_dataset(ds, augmentation)
+        if train and input_ready is not None:
+            ds, _ = add_input_probe(ds, input_ready)
+        return ds
+
+    def split_dataset(split_paths, split_y, shuffle, train=False, image_size=IMG_SIZE,
+                      batch_size=args.batch_size, augmentation=pipeline_augmentation):
+        if not args.strategy:
+            return local_dataset(split_paths, split_y, shuffle, batch_size, train=train,
+                                 image_size=image_size, augmentation=augmentation)
+
+        # One input pipeline per worker, each decoding only its shard of the files and
+        # batching per replica. Shards can differ by one image, so pipelines repeat and
+        # fit() runs a fixed number of steps.
+        def dataset_fn(ctx):
+            shard = (ctx.num_input_pipelines, ctx.input_pipeline_id) if ctx.num_input_pipelines > 1 else None
+            return local_dataset(split_paths, split_y, shuffle,
+                                 ctx.get_per_replica_batch_size(batch_size * strategy.num_replicas_in_sync),
+                                 shard, train, image_size, augmentation).repeat()
+        return strategy.distribute_datasets_from_function(dataset_fn)
+
+    def fit_steps(batch_size=args.batch_size):
+        if not args.strategy:
+            return {}
+        return {'steps_per_epoch': max(1, len(train_paths) // (batch_size * strategy.num_replicas_in_sync)),
+                'validation_steps': max(1, len(val_paths) // global_batch)}
+
+    val_ds = split_dataset(val_paths, val_y, shuffle=False)
+    if args.strategy:
+        print(f"✓ {args.strategy}: {strategy.num_replicas_in_sync} replicas, global batch {global_batch}")
+
+    with strategy.scope():
+        base_model, model = build_enhanced_model(len(classes), augment=pipeline_augmentation is None,
+                                                 input_size=None if sizes else IMG_SIZE)
+    phase1_report = ThroughputReport("Phase 1", input_ready)
+    phase2_report = ThroughputReport("Phase 2", input_ready)
+    backup_dir = Path(output_path(args.backup_dir))
+    if backup_dir.exists() and not args.resume:
+        shutil.rmtree(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    phase1_done = backup_dir / 'phase1_complete.npz'
+
+    def with_backup(phase, callbacks):
+        return callbacks + [PhaseBackup(backup_dir / phase, callbacks, save_freq=args.backup_steps)]
+
+    def save_weights_marker(path):
+        np.savez(path.with_name(path.stem + '.tmp.npz'), *model.get_weights())
+        os.replace(path.with_name(path.stem + '.tmp.npz'), path)
+
+    def load_weights_marker(path):
+        with np.load(path) as f:
+            model.set_weights([f[f'arr_{i}'] for i in range(len(f.files))])
+
+    stage_log = []
+
+    def fit_phase(phase, epochs, callbacks, stage_callbacks):
+        """
+        Trains one phase with a single fit() at IMG_SIZE or, with --progressive, one fit()
+        per resolution stage. Earlier stages run their fixed epoch span with
+        `stage_callbacks`; the final full-resolution stage gets `callbacks` (early stopping,
+        LR schedule, ...). Finished stages leave a weights marker that --resume skips past.
+        """
+        key = phase.lower().replace(' ', '')
+        stages = (progressive_schedule(epochs, sizes, args.batch_size) if sizes
+                  else [(IMG_SIZE, args.batch_size, 1.0, 0, epochs)])
+        for i, (size, batch_size, strength, first, end) in enumerate(stages):
+            final = i == len(stages) - 1
+            name = key if final else f'{key}_{size}px'
+            done = backup_dir / f'{name}_complete.npz'
+            if not final and done.exists():
+                load_weights_marker(done)
+                print(f"✓ {phase} {size}px stage already completed; resuming from '{done}'.")
+                continue
+            train_ds = split_dataset(train_paths, train_y, shuffle=True, train=True, image_size=size, batch_size=batch_size,
+                                     augmentation=build_augmentation(strength) if sizes else pipeline_augmentation)
+            replicas = strategy.num_replicas_in_sync
+            if sizes:
+                print(f"\n{phase} stage {i + 1}/{len(stages)}: {size}px, batch {batch_size * replicas}, "
+                      f"augmentation x{strength:.2f}, epochs {first + 1}-{end}")
+            start = time.perf_counter()
+            history = model.fit(train_ds, validation_data=val_ds, initial_epoch=first, epochs=end,
+                                callbacks=with_backup(name, callbacks if final else stage_callbacks),
+                                **fit_steps(batch_size))
+            seconds = time.perf_counter() - start
+            stage_log.append({
+                'phase': phase, 'size': size, 'batch': batch_size * replicas, 'epochs': len(history.epoch),
+                'seconds': seconds, 'images_per_sec': len(history.epoch) * len(train_paths) / seconds,
+                'val_accuracy': max(history.history.get('val_accuracy') or [0.0]),
+            })
+            if not final:
+                save_weights_marker(done)
+
+    profilers = {}
+    if args.profile_dir:
+        start, end = (int(b) for b in args.profile_batches.split(','))
+        profilers = {phase: [ProfilerWindow(Path(args.profile_dir) / phase, start, end)]
+                     for phase in ('phase1', 'phase2')}
     
     # --- PHASE 1: Feature Extraction (Train Top Layer) ---
     print("\n--- Phase 1: Training Top Layers ---")
-    model.compile(
-        optimizer=optimizers.Adam(learning_rate=1e-3),
-        loss=tf.keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
-        metrics=['accuracy']
-    )
+    with strategy.scope():
+        model.compile(
+            optimizer=optimizers.Adam(learning_rate=1e-3),
+            loss=tf.keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
+            metrics=['accuracy'],
+            jit_compile=args.jit_compile
+        )
     
-    callbacks = [
-        tf.keras.callbacks.ModelCheckpoint('best_model_phase1.keras', save_best_only=True, monitor='val_accuracy'),
-        tf.keras.callbacks.EarlyStopping(patience=3, restore_best_weights=True)
-    ]
-    
-    model.fit(train_ds, validation_data=val_ds, epochs=args.epochs, callbacks=callbacks)
+    if phase1_done.exists():
+        load_weights_marker(phase1_done)
+        print(f"✓ Phase 1 already completed; resuming from '{phase1_done}'.")
+    elif args.phase1_embeddings:
+        # The backbone is frozen in Phase 1, so run it once and train only the head.
+        emb_dir = Path(args.phase1_embeddings)
+        emb_dir.mkdir(parents=True, exist_ok=True)
+        train_feats = compute_embeddings(
+            model, local_dataset(train_paths, train_y, shuffle=False), len(train_paths),
+            emb_dir / f'train_{_paths_digest(train_paths)}.npy', views=args.embedding_views,
+            augmentation=pipeline_augmentation)
+        val_feats = compute_embeddings(
+            model, local_dataset(val_paths, val_y, shuffle=False), len(val_paths),
+            emb_dir / f'val_{_paths_digest(val_paths)}.npy')
+
+        head_train_ds = make_embedding_dataset(train_feats, train_y, shuffle=True, batch_size=global_batch)
+        if args.stage_timing:
+            head_train_ds, phase1_report.input_ready = add_input_probe(head_train_ds)
+        with strategy.scope():
+            head = build_head_model(model)
+            head.compile(
+                optimizer=optimizers.Adam(learning_rate=1e-3),
+                loss=tf.keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
+                metrics=['accuracy'],
+                jit_compile=args.jit_compile
+            )
+        head.fit(
+            head_train_ds,
+            validation_data=make_embedding_dataset(val_feats, val_y, shuffle=False, batch_size=global_batch),
+            epochs=args.epochs,
+            callbacks=with_backup('phase1', [tf.keras.callbacks.EarlyStopping(patience=3, restore_best_weights=True),
+                                             phase1_report] + profilers.get('phase1', []))
+        )
+        # Head layers are shared, so the full model already carries the trained weights.
+        model.save(output_path('best_model_phase1.keras'))
+    else:
+        checkpoint = tf.keras.callbacks.ModelCheckpoint(output_path('best_model_phase1.keras'), save_best_only=True, monitor='val_accuracy')
+        callbacks = [
+            checkpoint,
+            tf.keras.callbacks.EarlyStopping(patience=3, restore_best_weights=True),
+            phase1_report
+        ] + profilers.get('phase1', [])
+        
+        fit_phase('Phase 1', args.epochs, callbacks, [checkpoint])
+    if not phase1_done.exists():
+        save_weights_marker(phase1_done)
     
     # --- PHASE 2: Fine-Tuning ---
     print("\n--- Phase 2: Fine-Tuning EfficientNet ---")
@@ -156,21 +1045,43 @@ def main():
     for layer in base_model.layers[:-30]:
         layer.trainable = False
         
-    model.compile(
-        optimizer=optimizers.Adam(learning_rate=1e-5), # Low Learning Rate is CRITICAL
-        loss=tf.keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
-        metrics=['accuracy']
-    )
+    with strategy.scope():
+        model.compile(
+            optimizer=optimizers.Adam(learning_rate=1e-5), # Low Learning Rate is CRITICAL
+            loss=tf.keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
+            metrics=['accuracy'],
+            jit_compile=args.jit_compile
+        )
     
+    checkpoint = tf.keras.callbacks.ModelCheckpoint(output_path('final_model.keras'), save_best_only=True, monitor='val_accuracy')
     ft_callbacks = [
-        tf.keras.callbacks.ModelCheckpoint('final_model.keras', save_best_only=True, monitor='val_accuracy'),
+        checkpoint,
         tf.keras.callbacks.EarlyStopping(patience=4, restore_best_weights=True),
-        tf.keras.callbacks.ReduceLROnPlateau(factor=0.2, patience=2)
-    ]
+        tf.keras.callbacks.ReduceLROnPlateau(factor=0.2, patience=2),
+        phase2_report
+    ] + profilers.get('phase2', [])
     
-    model.fit(train_ds, validation_data=val_ds, epochs=args.fine_tune_epochs, callbacks=ft_callbacks)
+    fit_phase('Phase 2', args.fine_tune_epochs, ft_callbacks, [checkpoint])
+    shutil.rmtree(backup_dir, ignore_errors=True)
     
+    if not is_chief:
+        return
+    if sizes:
+        for path in ('best_model_phase1.keras', 'final_model.keras'):
+            if os.path.exists(path):
+                pin_input_size(path, len(classes))
     print("✓ Training Complete. Saved 'final_model.keras' and 'classes.txt'.")
+    print("\nThroughput:")
+    print(f"  {phase1_report.summary()}")
+    print(f"  {phase2_report.summary()}")
+    if (sizes or args.schedule_log) and not args.resume:
+        # A resumed run only timed what was left, so it would skew the comparison.
+        record_schedule(args.schedule_log or 'schedule.json', ','.join(map(str, sizes)) if sizes else str(IMG_SIZE), stage_log)
+    if args.strategy:
+        record_scaling(args.scaling_log, args.strategy, strategy.num_replicas_in_sync, {
+            'Phase 1': phase1_report.steps_per_sec() * global_batch,
+            'Phase 2': phase2_report.steps_per_sec() * global_batch,
+        })
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+export_model.py
+
+Exports a trained Dog Breed Classifier as a lean, inference-only SavedModel.
+Features:
+- Augmentation layers (RandomFlip/Rotation/Zoom/Contrast) are stripped from the graph.
+- `serving_default` takes a batch of encoded JPEG/PNG bytes and runs decode,
+  resize and the forward pass in one graph call, returning top-k indices,
+  probabilities and class names.
+- `predict_images` takes already-preprocessed float32 224x224 RGB batches and
+  returns the full probability vector.
+"""
+
+from pathlib import Path
+import argparse
+import numpy as np
+import tensorflow as tf
+
+from dog_breed_classifier import IMG_SIZE, decode_image_bytes, build_inference_model
+
+
+class ServingModule(tf.Module):
+    def __init__(self, model, classes, top_k):
+        super().__init__()
+        self.model = model
+        self.classes = tf.constant(classes)
+        self.top_k = top_k
+
+    @tf.function(input_signature=[tf.TensorSpec([None], tf.string, name='image_bytes')])
+    def serve_bytes(self, image_bytes):
+        images = tf.map_fn(
+            decode_image_bytes, image_bytes,
+            fn_output_signature=tf.TensorSpec([IMG_SIZE, IMG_SIZE, 3], tf.float32),
+            parallel_iterations=16
+        )
+        probs = self.model(images, training=False)
+        top = tf.math.top_k(probs, k=self.top_k)
+        return {
+            'indices': top.indices,
+            'probabilities': top.values,
+            'classes': tf.gather(self.classes, top.indices),
+        }
+
+    @tf.function(input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32, name='images')])
+    def predict_images(self, images):
+        return {'probabilities': self.model(images, training=False)}
+
+
+def export(model_path, classes_path, output_dir, top_k=5):
+    model = tf.keras.models.load_model(model_path)
+    with open(classes_path, 'r') as f:
+        classes = [line.strip() for line in f if line.strip()]
+
+    lean = build_inference_model(model)
+    print(f"✓ Stripped {len(model.layers) - len(lean.layers)} augmentation layer(s).")
+
+    module = ServingModule(lean, classes, min(top_k, len(classes)))
+    tf.saved_model.save(module, str(output_dir), signatures={
+        'serving_default': module.serve_bytes,
+        'predict_images': module.predict_images,
+    })
+    print(f"✓ Exported SavedModel to '{output_dir}'.")
+    return module
+
+
+def check_export(output_dir, model_path):
+    """
+    Reloads the export and compares it with the Keras model on a random image.
+    """
+    loaded = tf.saved_model.load(str(output_dir))
+    model = tf.keras.models.load_model(model_path)
+    pixels = np.random.randint(0, 256, (IMG_SIZE + 37, IMG_SIZE + 11, 3), dtype=np.uint8)
+    encoded = tf.io.encode_jpeg(pixels, quality=95)
+
+    served = loaded.signatures['serving_default'](image_bytes=tf.reshape(encoded, [1]))
+    reference = model(tf.expand_dims(decode_image_bytes(encoded), 0), training=False).numpy()[0]
+    top_idx = int(served['indices'][0, 0])
+    drift = abs(float(served['probabilities'][0, 0]) - float(reference[top_idx]))
+    print(f"✓ Export check: top-1 {'matches' if top_idx == int(np.argmax(reference)) else 'DIFFERS'}, "
+          f"max probability drift {drift:.2e}.")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_path', default='final_model.keras', help="Trained .keras model")
+    parser.add_argument('--classes', default='classes.txt', help="Ordered class names file")
+    parser.add_argument('--output_dir', default='saved_model', help="SavedModel output directory")
+    parser.add_argument('--top_k', type=int, default=5, help="Predictions returned per image by serving_default")
+    args = parser.parse_args()
+
+    export(args.model_path, args.classes, Path(args.output_dir), top_k=args.top_k)
+    check_export(Path(args.output_dir), args.model_path)
+
+
+if __name__ == '__main__':
+    main()
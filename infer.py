@@ -0,0 +1,132 @@
+"""
+infer.py
+
+Inference script for the trained Dog Breed Classifier.
+Features:
+- Single-image top-k predictions (--image_path).
+- Bulk scoring of a whole image directory into a Kaggle-style CSV (--output_csv).
+- Parallel JPEG decoding through the same tf.data pipeline used for training.
+- Rows are streamed to the CSV batch by batch, so memory stays flat.
+- Resumes a half-written output file instead of re-scoring finished images.
+"""
+
+from pathlib import Path
+import csv
+import argparse
+import time
+import numpy as np
+import tensorflow as tf
+
+from dog_breed_classifier import preprocess_image, make_dataset
+
+
+def read_classes(classes_txt: Path):
+    with classes_txt.open('r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def submission_columns(classes):
+    # classes.txt may hold synset-prefixed names ("n02085620-chihuahua");
+    # the submission format uses the bare breed name.
+    return [c.split('-', 1)[1] if c[:1] == 'n' and c[1:9].isdigit() and '-' in c else c for c in classes]
+
+
+def read_finished_ids(output_csv: Path, num_columns):
+    """
+    Returns the ids already scored in `output_csv`.
+    A trailing row cut short by an interrupted run is dropped from the file.
+    """
+    if not output_csv.exists():
+        return set()
+
+    with output_csv.open('r', newline='') as f:
+        text = f.read()
+    rows = list(csv.reader(text.splitlines()))
+    if not rows:
+        return set()
+
+    header, body = rows[0], rows[1:]
+    if len(header) != num_columns:
+        raise ValueError(f"{output_csv} has {len(header)} columns, expected {num_columns}.")
+
+    complete = [row for row in body if len(row) == num_columns]
+    if body and not text.endswith('\n') and complete and complete[-1] is body[-1]:
+        complete.pop()
+    if len(complete) != len(body):
+        with output_csv.open('w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(complete)
+        print(f"! Dropped {len(body) - len(complete)} incomplete row(s) from {output_csv}.")
+
+    return {row[0] for row in complete}
+
+
+def predict_image(model, classes, image_path: Path, top_k=3):
+    img = preprocess_image(str(image_path))
+    probs = model.predict(tf.expand_dims(img, 0), verbose=0)[0]
+    top = np.argsort(probs)[::-1][:top_k]
+    print(f"Top {top_k} predictions:")
+    for rank, idx in enumerate(top, 1):
+        print(f"  {rank}. {classes[idx]}: {probs[idx]:.4f}")
+
+
+def score_directory(model, classes, image_dir: Path, output_csv: Path, batch_size, resume=True):
+    columns = ['id'] + submission_columns(classes)
+    finished = read_finished_ids(output_csv, len(columns)) if resume else set()
+
+    paths = sorted(image_dir.glob('*.jpg'))
+    todo = [p for p in paths if p.stem not in finished]
+    print(f"✓ Found {len(paths)} images | Already scored: {len(paths) - len(todo)} | To score: {len(todo)}")
+    if not todo:
+        return
+
+    ds = make_dataset([str(p) for p in todo], [p.stem for p in todo], shuffle=False, batch_size=batch_size)
+
+    append = resume and output_csv.exists() and output_csv.stat().st_size > 0
+    scored = 0
+    start = time.perf_counter()
+    with output_csv.open('a' if append else 'w', newline='') as f:
+        writer = csv.writer(f)
+        if not append:
+            writer.writerow(columns)
+        for images, ids in ds:
+            probs = model.predict_on_batch(images)
+            for img_id, row in zip(ids.numpy(), np.asarray(probs)):
+                writer.writerow([img_id.decode()] + [f"{p:.6f}" for p in row])
+            f.flush()
+            scored += len(probs)
+            elapsed = time.perf_counter() - start
+            print(f"\r  {scored}/{len(todo)} images | {scored / elapsed:.1f} images/sec", end='', flush=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✓ Scored {scored} images in {elapsed:.1f}s ({scored / elapsed:.1f} images/sec). Saved '{output_csv}'.")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_path', default='final_model.keras', help="Trained .keras model")
+    parser.add_argument('--classes', default='classes.txt', help="Ordered class names file")
+    parser.add_argument('--image_path', help="Predict a single image")
+    parser.add_argument('--top_k', type=int, default=3, help="Predictions shown for --image_path")
+    parser.add_argument('--output_csv', help="Score every image in --image_dir into this CSV")
+    parser.add_argument('--image_dir', default='test', help="Directory of .jpg files for --output_csv")
+    parser.add_argument('--batch_size', type=int, default=128, help="Images per forward pass in bulk mode")
+    parser.add_argument('--no_resume', action='store_true', help="Overwrite --output_csv instead of resuming it")
+    args = parser.parse_args()
+
+    if not args.image_path and not args.output_csv:
+        parser.error("one of --image_path or --output_csv is required")
+
+    classes = read_classes(Path(args.classes))
+    model = tf.keras.models.load_model(args.model_path)
+
+    if args.image_path:
+        predict_image(model, classes, Path(args.image_path), top_k=args.top_k)
+    if args.output_csv:
+        score_directory(model, classes, Path(args.image_dir), Path(args.output_csv),
+                        batch_size=args.batch_size, resume=not args.no_resume)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+quantize_model.py
+
+Post-training quantization of the Dog Breed Classifier into TFLite artifacts.
+Features:
+- Dynamic-range, float16 and full-int8 quantization (int8 calibrated on training images).
+- Augmentation layers are stripped before conversion.
+- Report of top-1 agreement with the float Keras model, accuracy, latency and
+  file size on the validation split.
+- `TFLiteModel`, a Keras-like `predict` wrapper used by the Streamlit app's TFLite backend.
+"""
+
+from pathlib import Path
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+import numpy as np
+import tensorflow as tf
+
+from dog_breed_classifier import (
+    verify_dataset, build_label_mapping, split_train_val,
+    preprocess_image, build_inference_model,
+)
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    Interpreter = tf.lite.Interpreter
+
+QUANTIZATION_MODES = ('dynamic', 'float16', 'int8')
+
+
+class TFLiteModel:
+    """
+    Wraps a TFLite interpreter behind a Keras-like `predict(images)`.
+    The interpreter is not thread-safe, so calls are serialized.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.interpreter = Interpreter(model_path=str(model_path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()
+
+    def predict(self, images, verbose=0):
+        images = np.asarray(images, dtype=np.float32)
+        with self._lock:
+            if len(images) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], images.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(images)
+            self.interpreter.set_tensor(self._input['index'], images)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output['index']).copy()
+
+
+def representative_images(paths, num_samples):
+    sample = random.Random(0).sample(list(paths), min(num_samples, len(paths)))
+    for path in sample:
+        yield [tf.expand_dims(preprocess_image(path), 0)]
+
+
+def convert(model, mode, calibration_paths=None, num_calibration=200):
+    # Converting through Keras' own SavedModel export freezes every variable;
+    # from_keras_model/from_concrete_functions break on Keras 3 models.
+    with tempfile.TemporaryDirectory() as tmp:
+        model.export(tmp, format='tf_saved_model', verbose=False)
+        converter = tf.lite.TFLiteConverter.from_saved_model(tmp)
+        return _convert_with(converter, mode, calibration_paths, num_calibration)
+
+
+def _convert_with(converter, mode, calibration_paths, num_calibration):
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if mode == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == 'int8':
+        converter.representative_dataset = lambda: representative_images(calibration_paths, num_calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        try:
+            return converter.convert()
+        except Exception as e:
+            # Keep float fallbacks for any op without an int8 kernel.
+            print(f"! Strict int8 conversion failed ({e.__class__.__name__}); allowing float fallback ops.")
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8, tf.lite.OpsSet.TFLITE_BUILTINS]
+    return converter.convert()
+
+
+def evaluate(predict_fn, images, batch_size=32):
+    probs, elapsed = [], 0.0
+    for i in range(0, len(images), batch_size):
+        batch = images[i:i + batch_size]
+        start = time.perf_counter()
+        probs.append(predict_fn(batch))
+        elapsed += time.perf_counter() - start
+    return np.concatenate(probs), elapsed / len(images)
+
+
+def single_image_latency(predict_fn, image, repeats=20):
+    batch = image[np.newaxis]
+    predict_fn(batch)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predict_fn(batch)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_path', default='final_model.keras', help="Trained .keras model")
+    parser.add_argument('--output_dir', default='.', help="Where the .tflite files are written")
+    parser.add_argument('--modes', nargs='+', choices=QUANTIZATION_MODES, default=list(QUANTIZATION_MODES))
+    parser.add_argument('--num_calibration', type=int, default=200, help="Training images used to calibrate int8")
+    parser.add_argument('--num_eval', type=int, default=500, help="Validation images used for the report (0 = all)")
+    args = parser.parse_args()
+
+    paths, labels_raw = verify_dataset(Path('.'))
+    label2idx, classes = build_label_mapping(labels_raw)
+    y_indices = [label2idx[l] for l in labels_raw]
+    train_paths, val_paths, _, val_y = split_train_val(paths, y_indices, y_indices)
+    if args.num_eval:
+        val_paths, val_y = val_paths[:args.num_eval], val_y[:args.num_eval]
+    val_y = np.asarray(val_y)
+
+    model = build_inference_model(tf.keras.models.load_model(args.model_path))
+    print(f"Loading {len(val_paths)} validation images for the report...")
+    val_images = np.stack([preprocess_image(p).numpy() for p in val_paths])
+
+    float_probs, float_latency = evaluate(lambda b: model(b, training=False).numpy(), val_images)
+    float_top1 = float_probs.argmax(axis=1)
+    float_single = single_image_latency(lambda b: model(b, training=False).numpy(), val_images[0])
+    report = [('float32 (Keras)', os.path.getsize(args.model_path), 1.0,
+               np.mean(float_top1 == val_y), float_latency, float_single)]
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for mode in args.modes:
+        print(f"\nConverting ({mode})...")
+        out_path = output_dir / f'model_{mode}.tflite'
+        out_path.write_bytes(convert(model, mode, train_paths, args.num_calibration))
+        print(f"✓ Saved '{out_path}'.")
+
+        tflite = TFLiteModel(out_path)
+        probs, latency = evaluate(tflite.predict, val_images)
+        top1 = probs.argmax(axis=1)
+        report.append((mode, out_path.stat().st_size, np.mean(top1 == float_top1),
+                       np.mean(top1 == val_y), latency, single_image_latency(tflite.predict, val_images[0])))
+
+    print(f"\nValidation report ({len(val_paths)} images):")
+    print(f"  {'model':<16} {'size MB':>8} {'agree':>7} {'acc':>7} {'ms/img@32':>10} {'ms/img@1':>9}")
+    for name, size, agree, acc, latency, single in report:
+        print(f"  {name:<16} {size / 1e6:>8.1f} {agree:>7.2%} {acc:>7.2%} {latency * 1e3:>10.2f} {single * 1e3:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
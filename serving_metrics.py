@@ -0,0 +1,132 @@
+"""
+serving_metrics.py
+
+Opt-in per-stage latency histograms for the PawIdentify app.
+Features:
+- `StageMetrics`: thread-safe fixed-bucket histograms (count, sum, buckets) per stage,
+  filled through `with metrics.time('stage'):`. Disabled instances record nothing.
+- Prometheus text exposition via `render_prometheus()`, served on `/metrics` by `serve_metrics(port)`.
+- `log_periodically(seconds)`: one log line per interval with count/mean/p50/p99 per stage.
+"""
+
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import logging
+import threading
+import time
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is +Inf.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("pawidentify")
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms shared by every session of the process.
+    """
+
+    def __init__(self, enabled=True, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._stages = {}  # stage -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts, total = self._stages.get(stage) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[slot] += 1
+            self._stages[stage] = (counts, total + seconds)
+
+    @contextmanager
+    def _timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Recorded in `finally` so Streamlit's rerun/stop exceptions are still timed.
+            self.observe(stage, time.perf_counter() - start)
+
+    def time(self, stage):
+        return self._timer(stage) if self.enabled else nullcontext()
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: (list(counts), total) for stage, (counts, total) in self._stages.items()}
+
+    def quantile(self, counts, q):
+        """
+        Linear interpolation inside the bucket that holds the q-th observation.
+        """
+        target, seen, lower = q * sum(counts), 0, 0.0
+        for upper, count in zip(self.buckets + (float('inf'),), counts):
+            if count and seen + count >= target:
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def render_prometheus(self, name="pawidentify_stage_seconds"):
+        lines = [f"# HELP {name} Time spent per request stage.", f"# TYPE {name} histogram"]
+        for stage, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for upper, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{upper}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {sum(counts)}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {sum(counts)}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        parts = []
+        for stage, (counts, total) in sorted(self.snapshot().items()):
+            n = sum(counts)
+            parts.append(f"{stage} n={n} mean {total / n * 1000:.1f} ms p50 {self.quantile(counts, 0.5) * 1000:.1f} ms "
+                         f"p99 {self.quantile(counts, 0.99) * 1000:.1f} ms")
+        return ' | '.join(parts)
+
+    def serve_metrics(self, port):
+        """
+        Starts a daemon HTTP server exposing the histograms on http://<host>:<port>/metrics.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('', port), Handler)
+        threading.Thread(target=server.serve_forever, name="stage-metrics-http", daemon=True).start()
+        logger.info(f"Stage metrics served on :{server.server_address[1]}/metrics")
+        return server
+
+    def log_periodically(self, seconds):
+        """
+        Logs `summary()` every `seconds` from a daemon thread, skipping idle intervals.
+        """
+        def run():
+            last = None
+            while True:
+                time.sleep(seconds)
+                current = self.snapshot()
+                if current and current != last:
+                    logger.info(f"Stage latency: {self.summary()}")
+                    last = current
+
+        threading.Thread(target=run, name="stage-metrics-log", daemon=True).start()
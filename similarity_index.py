@@ -0,0 +1,144 @@
+"""
+similarity_index.py
+
+Memory-mapped nearest-neighbour index over training-image embeddings for the PawIdentify app.
+Features:
+- L2-normalized float16 embedding matrix stored as .npy and opened with mmap_mode='r',
+  so every app process on a host shares the same page-cache pages.
+- Exact cosine search over fixed-size row blocks (one matrix-vector product and an
+  argpartition per block, then a merged top-k).
+- Optional IVF partitioning for large galleries: spherical k-means lists, rows stored
+  list-contiguously, and only the `nprobe` closest lists scanned per query.
+- `build_index()` writes an index directory; `EmbeddingIndex.load()` opens one.
+"""
+
+from pathlib import Path
+import json
+import os
+import numpy as np
+
+SEARCH_BLOCK = 8192   # Rows converted to float32 and scored at a time
+
+
+def normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+
+def _assign(x, centroids, block=SEARCH_BLOCK):
+    return np.concatenate([np.argmax(normalize(x[i:i + block]) @ centroids.T, axis=1)
+                           for i in range(0, len(x), block)])
+
+
+def spherical_kmeans(x, num_lists, iterations=20, sample=65536, seed=0):
+    """
+    Cosine k-means centroids (unit length) fitted on at most `sample` rows of `x`.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(x), min(len(x), sample), replace=False))
+    train = normalize(x[rows])
+    centroids = train[rng.choice(len(train), num_lists, replace=False)]
+    for _ in range(iterations):
+        assign = _assign(train, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, train)
+        counts = np.bincount(assign, minlength=num_lists)
+        empty = counts == 0
+        # Empty lists are re-seeded with random rows.
+        sums[empty] = train[rng.choice(len(train), int(empty.sum()), replace=False)]
+        centroids = normalize(sums)
+    return centroids
+
+
+def build_index(out_dir, embeddings, paths, labels, num_lists=0, model=None):
+    """
+    Writes an index of `embeddings` (N x D, any float dtype, may be a memmap) to `out_dir`:
+    embeddings.npy (normalized float16), plus centroids.npy/offsets.npy with `num_lists`.
+    meta.json is written last, so a half-written index is never loaded.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = out_dir / 'meta.json'
+    if meta_path.exists():
+        meta_path.unlink()
+
+    order = np.arange(len(embeddings))
+    if num_lists:
+        centroids = spherical_kmeans(embeddings, num_lists)
+        assign = _assign(embeddings, centroids)
+        order = np.argsort(assign, kind='stable')
+        offsets = np.searchsorted(assign[order], np.arange(num_lists + 1))
+        np.save(out_dir / 'centroids.npy', centroids)
+        np.save(out_dir / 'offsets.npy', offsets)
+
+    matrix = np.lib.format.open_memmap(out_dir / 'embeddings.npy', mode='w+', dtype=np.float16,
+                                       shape=(len(embeddings), embeddings.shape[1]))
+    for i in range(0, len(order), SEARCH_BLOCK):
+        rows = order[i:i + SEARCH_BLOCK]
+        matrix[i:i + len(rows)] = normalize(embeddings[rows])
+    matrix.flush()
+    del matrix
+
+    meta = {
+        'count': len(order), 'dim': int(embeddings.shape[1]), 'num_lists': num_lists, 'model': model,
+        'paths': [paths[i] for i in order], 'labels': [labels[i] for i in order],
+    }
+    tmp_path = meta_path.with_suffix('.tmp')
+    with tmp_path.open('w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+class EmbeddingIndex:
+    """
+    Read-only cosine index. `search()` returns (scores, rows) for the top-k rows,
+    best first; `paths` and `labels` map rows back to training images.
+    """
+
+    def __init__(self, embeddings, paths, labels, centroids=None, offsets=None, model=None):
+        self.embeddings = embeddings
+        self.paths = paths
+        self.labels = labels
+        self.centroids = centroids
+        self.offsets = offsets
+        self.model = model
+
+    @classmethod
+    def load(cls, index_dir):
+        index_dir = Path(index_dir)
+        with (index_dir / 'meta.json').open('r') as f:
+            meta = json.load(f)
+        centroids = offsets = None
+        if meta['num_lists']:
+            centroids = np.load(index_dir / 'centroids.npy')
+            offsets = np.load(index_dir / 'offsets.npy')
+        return cls(np.load(index_dir / 'embeddings.npy', mmap_mode='r'), meta['paths'], meta['labels'],
+                   centroids, offsets, meta.get('model'))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def search(self, query, k=5, nprobe=8):
+        q = normalize(query).ravel()
+        if self.centroids is None:
+            ranges = [(0, len(self))]
+        else:
+            lists = np.argsort(-(self.centroids @ q))[:nprobe]
+            ranges = sorted((int(self.offsets[l]), int(self.offsets[l + 1])) for l in lists)
+
+        best_scores, best_rows = np.empty(0, np.float32), np.empty(0, np.int64)
+        for start, end in ranges:
+            for i in range(start, end, SEARCH_BLOCK):
+                scores = self.embeddings[i:min(end, i + SEARCH_BLOCK)].astype(np.float32) @ q
+                top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+                best_scores = np.concatenate([best_scores, scores[top]])
+                best_rows = np.concatenate([best_rows, top + i])
+                if len(best_scores) > k:
+                    keep = np.argpartition(-best_scores, k - 1)[:k]
+                    best_scores, best_rows = best_scores[keep], best_rows[keep]
+        order = np.argsort(-best_scores)
+        return best_scores[order], best_rows[order]
+
+    def neighbours(self, query, k=5, nprobe=8):
+        scores, rows = self.search(query, k, nprobe)
+        return [{'path': self.paths[r], 'label': self.labels[r], 'score': float(s)} for s, r in zip(scores, rows)]
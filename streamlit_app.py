@@ -12,9 +12,23 @@ Theme: Ultra Light / Professional
 import streamlit as st
 import numpy as np
 import os
+import sys
 import time
-from PIL import Image, ImageOps
-import tensorflow as tf
+import logging
+import hashlib
+import io
+import base64
+import threading
+import queue
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque, OrderedDict
+from PIL import Image
+
+# TensorFlow is imported lazily on the model-loader thread, so the UI renders without it.
+from serving_metrics import StageMetrics
+from similarity_index import EmbeddingIndex
+from breed_knowledge import BreedKnowledgeStore, ChatEngine, LIFE_STAGES, WEEKDAYS, normalize_breed_name
 
 # ==============================================================================
 # 1. APPLICATION CONFIGURATION & CONSTANTS
@@ -25,13 +39,66 @@ APP_ICON = "🐕"
 LAYOUT_MODE = "wide"
 
 # Model Configuration
-MODEL_FILE_PATH = 'final_model.keras'
+MODEL_FILE_PATH = os.environ.get('PAWIDENTIFY_MODEL', 'final_model.keras')  # e.g. student_model.keras from distill_model.py
 CLASSES_FILE_PATH = 'classes.txt'
+BREEDS_FILE_PATH = '120_breeds.json'
+DIET_PLANS_FILE_PATH = '120_diet_plans.json'
 CONFIDENCE_THRESHOLD = 50.0  # Percentage required to be considered a valid match
 
+# Serving Backend: 'keras' (float32 model) or 'tflite' (quantized model from quantize_model.py)
+MODEL_BACKEND = os.environ.get('PAWIDENTIFY_BACKEND', 'keras')
+TFLITE_MODEL_PATH = os.environ.get('PAWIDENTIFY_TFLITE_MODEL', 'model_dynamic.tflite')
+
+# Model Cascade (opt-in: a cheap model answers alone when its top-1 confidence clears the
+# threshold; the full model only runs for the rest. Calibrate with calibrate_cascade.py.)
+CASCADE_MODEL_PATH = os.environ.get('PAWIDENTIFY_CASCADE_MODEL', '')    # .keras or .tflite
+CASCADE_THRESHOLD = float(os.environ.get('PAWIDENTIFY_CASCADE_THRESHOLD', 0.9))
+
+# Similar Dogs (opt-in: enabled when the index from build_similarity_index.py exists)
+SIMILARITY_INDEX_DIR = os.environ.get('PAWIDENTIFY_SIMILARITY_INDEX', 'similarity_index')
+SIMILAR_DOGS_K = int(os.environ.get('PAWIDENTIFY_SIMILAR_K', 6))
+SIMILARITY_NPROBE = int(os.environ.get('PAWIDENTIFY_SIMILAR_NPROBE', 8))   # IVF lists scanned per query
+
 # Image Configuration
 IMG_HEIGHT = 224
 IMG_WIDTH = 224
+DRAFT_OVERSAMPLE = 2      # JPEGs are DCT-decoded to >= 2x the model input before resampling
+DISPLAY_IMAGE_SIDE = 800  # Longer side of the pre-encoded JPEG shown on the result dashboard
+DISPLAY_CACHE_SIZE = 256  # Encoded dashboard photos kept process-wide
+
+# Monitoring
+LATENCY_WINDOW = 500  # Recent requests used for the p50/p99 latency log line
+
+# Prediction Cache (keyed by uploaded bytes + model version, shared by all sessions)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PAWIDENTIFY_CACHE_SIZE', 1024))
+
+# Micro-Batching (requests from all sessions are grouped into one forward pass; 1 disables)
+MAX_BATCH_SIZE = int(os.environ.get('PAWIDENTIFY_MAX_BATCH', 16))
+MAX_BATCH_WAIT_MS = float(os.environ.get('PAWIDENTIFY_MAX_WAIT_MS', 5))
+
+# Multi-Image Uploads (decoded on a shared thread pool, classified in chunks)
+MAX_UPLOAD_FILES = int(os.environ.get('PAWIDENTIFY_MAX_UPLOADS', 100))
+DECODE_WORKERS = int(os.environ.get('PAWIDENTIFY_DECODE_WORKERS', min(8, os.cpu_count() or 1)))
+UPLOAD_CHUNK_SIZE = 16    # Images per forward pass and per results-table update
+THUMBNAIL_SIZE = 96       # Longer side of the results-table thumbnails
+BATCH_PREVIEW_SIDE = 640  # Longer side of the JPEG kept per batch photo (opened on the dashboard)
+
+# Session Memory (per-session data lives in a process-wide store with size accounting)
+SESSION_TTL_SECONDS = float(os.environ.get('PAWIDENTIFY_SESSION_TTL', 1800))   # Idle sessions' data is dropped after this
+MAX_CHAT_MESSAGES = int(os.environ.get('PAWIDENTIFY_MAX_CHAT_MESSAGES', 40))   # Oldest messages beyond this are dropped
+TOP_K = 5                 # Predictions kept per analysis
+MEMORY_VIEW = os.environ.get('PAWIDENTIFY_MEMORY_VIEW', '0') == '1'           # Serve the ?view=memory page
+
+# Stage Metrics (opt-in: decode/preprocess/predict/render timers stay off unless one is set)
+METRICS_PORT = int(os.environ.get('PAWIDENTIFY_METRICS_PORT', 0))                   # Prometheus /metrics
+METRICS_LOG_SECONDS = float(os.environ.get('PAWIDENTIFY_METRICS_LOG_SECONDS', 0))   # Periodic log line
+
+logger = logging.getLogger("pawidentify")
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s [pawidentify] %(message)s"))
+    logger.addHandler(_handler)
 
 # Setup Streamlit Page
 st.set_page_config(
@@ -422,72 +489,658 @@ FALLBACK_DATA = {
     "Bio": "A loyal canine companion identified by our AI. While we don't have specific history for this breed in our quick-access database, they are likely a wonderful pet!"
 }
 
+# Curated entries that also cover classes under a different name
+CURATED_ALIASES = {
+    "Toy Poodle": "Poodle",
+    "Miniature Poodle": "Poodle",
+    "Standard Poodle": "Poodle",
+}
+
 # ==============================================================================
 # 4. LOGIC & UTILITIES
 # ==============================================================================
 
+def _build_model_engine(timings):
+    """
+    Loads the model for the configured backend and the class names file.
+    Returns a warmed-up `predict_fn(batch) -> probabilities` and the classes.
+    Fills `timings` (seconds) with the import / model load / warm-up breakdown.
+    """
+    model_path = TFLITE_MODEL_PATH if MODEL_BACKEND == 'tflite' else MODEL_FILE_PATH
+    if not os.path.exists(model_path):
+        return None, None
+
+    start = time.perf_counter()
+    import tensorflow as tf
+    if MODEL_BACKEND == 'tflite':
+        from quantize_model import TFLiteModel
+    timings['import'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if MODEL_BACKEND == 'tflite':
+        predict_fn = TFLiteModel(model_path).predict
+    else:
+        predict_fn = build_predict_fn(_load_keras_model(model_path))
+    with open(CLASSES_FILE_PATH, 'r') as f:
+        classes = [line.strip() for line in f.readlines()]
+    timings['model_load'] = time.perf_counter() - start
+
+    # Warm-up so the first user does not pay for tracing / tensor allocation.
+    start = time.perf_counter()
+    predict_fn(np.zeros((1, IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.float32))
+    timings['warm_up'] = time.perf_counter() - start
+
+    cheap_fn = None
+    if CASCADE_MODEL_PATH:
+        start = time.perf_counter()
+        if CASCADE_MODEL_PATH.endswith('.tflite'):
+            from quantize_model import TFLiteModel
+            cheap_fn = TFLiteModel(CASCADE_MODEL_PATH).predict
+        else:
+            cheap_fn = build_predict_fn(tf.keras.models.load_model(CASCADE_MODEL_PATH))
+        cheap_fn(np.zeros((1, IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.float32))
+        timings['cascade_load'] = time.perf_counter() - start
+
+    if MAX_BATCH_SIZE > 1:
+        predict_fn = MicroBatcher(predict_fn, MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS / 1000).predict
+        if cheap_fn:
+            cheap_fn = MicroBatcher(cheap_fn, MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS / 1000).predict
+    if cheap_fn:
+        predict_fn = ModelCascade(cheap_fn, predict_fn, CASCADE_THRESHOLD).predict
+    return predict_fn, classes
+
+_keras_models = {}
+
+def _load_keras_model(path):
+    """
+    Loads each .keras file once per process, so the classifier and the embedding
+    model share one copy of the weights.
+    """
+    if path not in _keras_models:
+        import tensorflow as tf
+        _keras_models[path] = tf.keras.models.load_model(path)
+    return _keras_models[path]
+
+def _build_similarity_engine(timings):
+    """
+    Opens the memory-mapped similar-dogs index and builds a warmed-up
+    `embed_fn(batch) -> pooled features` from the Keras model it was built with.
+    Returns (None, None) without an index or when the index belongs to another model.
+    """
+    if not os.path.exists(os.path.join(SIMILARITY_INDEX_DIR, 'meta.json')) or not os.path.exists(MODEL_FILE_PATH):
+        return None, None
+    start = time.perf_counter()
+    index = EmbeddingIndex.load(SIMILARITY_INDEX_DIR)
+    stat = os.stat(MODEL_FILE_PATH)
+    if index.model and (index.model['mtime_ns'], index.model['size']) != (stat.st_mtime_ns, stat.st_size):
+        logger.warning(f"Similarity index '{SIMILARITY_INDEX_DIR}' was built from another model; similar dogs disabled.")
+        return None, None
+
+    from dog_breed_classifier import build_embedding_model
+    embed_fn = build_predict_fn(build_embedding_model(_load_keras_model(MODEL_FILE_PATH)))
+    embed_fn(np.zeros((1, IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.float32))
+    timings['similarity_load'] = time.perf_counter() - start
+    return index, embed_fn
+
+class ModelLoader:
+    """
+    Builds the model engine on a background thread as soon as it is created.
+    `wait()` blocks until the engine is ready and returns (predict_fn, classes).
+    The similar-dogs index and embedding function (if any) load after it.
+    """
+
+    def __init__(self):
+        self.engine = (None, None)
+        self.similarity = (None, None)
+        self.error = None
+        self.timings = {}
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._load, name="pawidentify-model-loader", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self.engine = _build_model_engine(self.timings)
+            if self.engine[0] is not None:
+                try:
+                    self.similarity = _build_similarity_engine(self.timings)
+                except Exception:
+                    logger.exception("Similarity index loading failed; similar dogs disabled")
+        except Exception as e:
+            self.error = e
+            logger.exception("Model loading failed")
+        finally:
+            self.timings['total'] = time.perf_counter() - start
+            self._ready.set()
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.timings.items())
+        logger.info(f"Model engine startup: {breakdown}")
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        self._ready.wait(timeout)
+        return self.engine
+
 @st.cache_resource
+def get_model_loader():
+    return ModelLoader()
+
 def load_model_engine():
     """
-    Loads the Keras model and the class names file.
+    Returns the (predict_fn, classes) engine, waiting for the background load if needed.
+    """
+    loader = get_model_loader()
+    predict_fn, classes = loader.wait()
+    if loader.error is not None:
+        st.error(f"Error loading model: {loader.error}")
+    return predict_fn, classes
+
+def build_predict_fn(model):
+    """
+    Traces the forward pass once with a fixed input signature. Calling it skips
+    the per-call data adapter and predict loop that `model.predict` sets up.
+    """
+    import tensorflow as tf
+    forward = tf.function(
+        lambda images: model(images, training=False),
+        input_signature=[tf.TensorSpec([None, IMG_HEIGHT, IMG_WIDTH, 3], tf.float32)]
+    )
+    return lambda images: forward(images).numpy()
+
+class MicroBatcher:
+    """
+    Shared inference queue. A single worker thread waits for the first request,
+    collects more for up to `max_wait` seconds or `max_batch` images, runs them
+    as one batch and hands each session its own row back.
+    """
+
+    def __init__(self, predict_fn, max_batch, max_wait):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.images = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="pawidentify-batcher", daemon=True)
+        self._worker.start()
+
+    def predict(self, images):
+        futures = []
+        for image in images:
+            future = Future()
+            self._queue.put((image, future))
+            futures.append(future)
+        return np.stack([future.result() for future in futures])
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                probs = self.predict_fn(np.stack([image for image, _ in pending]))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.images += len(pending)
+            if self.batches % 100 == 0:
+                logger.info(f"Micro-batcher: {self.batches} batches, mean batch size {self.mean_batch_size():.1f}")
+            for (_, future), row in zip(pending, probs):
+                future.set_result(row)
+
+    def mean_batch_size(self):
+        return self.images / self.batches if self.batches else 0.0
+
+class ModelCascade:
+    """
+    Two-stage inference. Every image goes through `cheap_fn`; rows whose top-1
+    probability is below `threshold` are re-run through `full_fn` and replaced.
+    """
+
+    def __init__(self, cheap_fn, full_fn, threshold):
+        self.cheap_fn = cheap_fn
+        self.full_fn = full_fn
+        self.threshold = threshold
+        self.images = 0
+        self.escalated = 0
+        self._lock = threading.Lock()
+
+    def predict(self, images):
+        probs = self.cheap_fn(images)
+        uncertain = np.flatnonzero(probs.max(axis=1) < self.threshold)
+        if len(uncertain):
+            probs = probs.copy()
+            probs[uncertain] = self.full_fn(images[uncertain])
+        with self._lock:
+            self.images += len(images)
+            self.escalated += len(uncertain)
+            if self.images % 100 < len(images):
+                logger.info(f"Cascade: {self.absorbed_fraction():.1%} of {self.images} images answered by the cheap model")
+        return probs
+
+    def absorbed_fraction(self):
+        return 1 - self.escalated / self.images if self.images else 0.0
+
+@st.cache_resource
+def get_latency_log():
+    """
+    Process-wide window of recent request latencies (seconds).
+    """
+    return deque(maxlen=LATENCY_WINDOW)
+
+@st.cache_resource
+def get_latency_lock():
+    """
+    Guards the latency window, which every session thread appends to.
+    """
+    return threading.Lock()
+
+def record_latency(seconds):
+    with get_latency_lock():
+        log = get_latency_log()
+        log.append(seconds)
+        window = list(log)
+    p50, p99 = np.percentile(window, [50, 99]) * 1000
+    cache = get_prediction_cache().stats()
+    logger.info(
+        f"Analysis took {seconds * 1000:.0f} ms | p50 {p50:.0f} ms, p99 {p99:.0f} ms over {len(window)} requests | "
+        f"cache hit rate {cache['hit_rate']:.1%} ({cache['hits']} hits, {cache['misses']} misses, "
+        f"{cache['entries']}/{cache['max_size']} entries)"
+    )
+
+class PredictionCache:
+    """
+    Thread-safe LRU map from content key to prediction vector, with hit/miss counters.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+@st.cache_resource
+def get_prediction_cache():
+    return PredictionCache(PREDICTION_CACHE_SIZE)
+
+@st.cache_resource
+def get_similarity_cache():
+    """
+    Neighbour lists per prediction-cache key, kept apart so the prediction hit rate stays meaningful.
+    """
+    return PredictionCache(PREDICTION_CACHE_SIZE)
+
+def approx_size(value):
+    """
+    Approximate deep size in bytes of session data (dicts, lists, tuples, str, bytes, numbers).
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+class SessionStore:
+    """
+    Process-wide home of every session's data (analysis, chat history, batch results),
+    keyed by the session id kept in st.session_state. Sizes are recorded on `put()`,
+    and a sweeper thread drops sessions idle for longer than `ttl` seconds.
+    """
+
+    def __init__(self, ttl, sweep_interval=60):
+        self.ttl = ttl
+        self.reclaimed = 0
+        self._sessions = {}  # session id -> {'active': monotonic time, 'data': {...}, 'sizes': {...}}
+        self._lock = threading.Lock()
+        if ttl > 0:
+            self._sweeper = threading.Thread(target=self._sweep, args=(min(sweep_interval, ttl),),
+                                             name="pawidentify-session-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def get(self, session_id, key, default=None):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return default
+            session['active'] = time.monotonic()
+            return session['data'].get(key, default)
+
+    def put(self, session_id, key, value):
+        """
+        Stores `value` (None removes the key). Values mutated after `put()` must be put again
+        to keep the accounting right.
+        """
+        size = approx_size(value) if value is not None else 0
+        with self._lock:
+            session = self._sessions.setdefault(session_id, {'data': {}, 'sizes': {}})
+            session['active'] = time.monotonic()
+            if value is None:
+                session['data'].pop(key, None)
+                session['sizes'].pop(key, None)
+            else:
+                session['data'][key] = value
+                session['sizes'][key] = size
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def reclaim(self, now=None):
+        """
+        Drops sessions idle for longer than the TTL; returns how many were dropped.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [sid for sid, session in self._sessions.items() if now - session['active'] > self.ttl]
+            freed = sum(sum(self._sessions[sid]['sizes'].values()) for sid in idle)
+            for sid in idle:
+                del self._sessions[sid]
+            self.reclaimed += len(idle)
+        if idle:
+            logger.info(f"Session store: reclaimed {len(idle)} idle session(s), {freed / 1e6:.2f} MB")
+        return len(idle)
+
+    def _sweep(self, interval):
+        while True:
+            time.sleep(interval)
+            self.reclaim()
+
+    def usage(self):
+        """
+        [(session id, {key: bytes}, idle seconds)] for every stored session, largest first.
+        """
+        now = time.monotonic()
+        with self._lock:
+            rows = [(sid, dict(session['sizes']), now - session['active']) for sid, session in self._sessions.items()]
+        return sorted(rows, key=lambda row: -sum(row[1].values()))
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore(SESSION_TTL_SECONDS)
+
+def process_rss():
+    """
+    Resident set size of this process in bytes (Linux), or None where /proc is unavailable.
     """
-    if not os.path.exists(MODEL_FILE_PATH):
-        return None, None
     try:
-        model = tf.keras.models.load_model(MODEL_FILE_PATH)
-        with open(CLASSES_FILE_PATH, 'r') as f:
-            classes = [line.strip() for line in f.readlines()]
-        return model, classes
-    except Exception as e:
-        st.error(f"Error loading model: {e}")
-        return None, None
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def find_similar_dogs(data, cache_key, img_array=None):
+    """
+    The SIMILAR_DOGS_K training photos closest to the upload in embedding space, or
+    None without an index. `img_array` (already preprocessed) is reused when given.
+    """
+    index, embed_fn = get_model_loader().similarity
+    if index is None:
+        return None
+    cache = get_similarity_cache()
+    similar = cache.get(cache_key)
+    if similar is None:
+        if img_array is None:
+            img_array = preprocess_image(open_upload(data, DRAFT_OVERSAMPLE * max(IMG_WIDTH, IMG_HEIGHT)))
+        with STAGE_METRICS.time('embed'):
+            query = embed_fn(img_array)[0]
+        with STAGE_METRICS.time('similar_search'):
+            similar = index.neighbours(query, SIMILAR_DOGS_K, SIMILARITY_NPROBE)
+        cache.put(cache_key, similar)
+    return similar
+
+@st.cache_resource
+def get_model_version():
+    """
+    Identifies the served model so cached predictions never outlive a model swap.
+    """
+    model_path = TFLITE_MODEL_PATH if MODEL_BACKEND == 'tflite' else MODEL_FILE_PATH
+    stat = os.stat(model_path)
+    version = f"{MODEL_BACKEND}:{os.path.abspath(model_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    if CASCADE_MODEL_PATH:
+        stat = os.stat(CASCADE_MODEL_PATH)
+        version += f"|cascade:{os.path.abspath(CASCADE_MODEL_PATH)}:{stat.st_mtime_ns}:{stat.st_size}:{CASCADE_THRESHOLD}"
+    return version
+
+def prediction_cache_key(image_bytes):
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{get_model_version()}:{digest}"
+
+def open_upload(data, min_side=None):
+    """
+    Opens uploaded bytes as RGB. For JPEGs with `min_side`, decoding is DCT-scaled
+    (draft mode) to the smallest size whose shorter side is still >= `min_side`.
+    """
+    img = Image.open(io.BytesIO(data))
+    if min_side:
+        img.draft('RGB', (min_side, min_side))
+    img.load()
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+def fit_box(size, target=(IMG_WIDTH, IMG_HEIGHT)):
+    """
+    Centered crop box with the target aspect ratio (same crop as `ImageOps.fit`).
+    """
+    width, height = size
+    ratio = target[0] / target[1]
+    if width / height > ratio:
+        crop_w, crop_h = height * ratio, height
+    else:
+        crop_w, crop_h = width, width / ratio
+    left, top = (width - crop_w) / 2, (height - crop_h) / 2
+    return (left, top, left + crop_w, top + crop_h)
 
-def preprocess_image(image):
+def preprocess_image(image, out=None):
     """
     Prepares an uploaded image for the Neural Network.
+    `image` is a PIL image or the raw upload bytes (bytes take the draft-mode decode).
+    Crop and LANCZOS resize run as one resample, and the pixels are cast straight
+    into `out`, a float32 [1, H, W, 3] buffer that is allocated when not given.
+    """
+    if isinstance(image, bytes):
+        image = open_upload(image, DRAFT_OVERSAMPLE * max(IMG_WIDTH, IMG_HEIGHT))
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    img = image.resize((IMG_WIDTH, IMG_HEIGHT), Image.LANCZOS, box=fit_box(image.size))
+    if out is None:
+        out = np.empty((1, IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.float32)
+    out[0] = np.asarray(img)
+    return out
+
+def format_breed_name(raw_name):
+    return raw_name.split('-', 1)[1].replace('_', ' ').title() if '-' in raw_name else raw_name
+
+def top_k_predictions(score, classes, k=TOP_K):
+    """
+    The k most likely (class name, probability) pairs, best first; all a session keeps of a prediction.
+    """
+    return [(classes[i], float(score[i])) for i in np.argsort(score)[::-1][:k]]
+
+def top_match(top_k):
+    """
+    (display breed name, confidence %) of the best prediction.
+    """
+    raw_name, prob = top_k[0]
+    return format_breed_name(raw_name), 100 * prob
+
+@st.cache_resource
+def get_decode_pool():
+    """
+    Process-wide thread pool for batch-upload decoding (PIL releases the GIL while decoding).
+    """
+    return ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="pawidentify-decode")
+
+def encode_jpeg(image, max_side, quality=85):
+    img = image.copy()
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=DISPLAY_CACHE_SIZE, show_spinner=False)
+def get_display_image(cache_key, _data):
+    """
+    The dashboard photo as JPEG bytes (longer side DISPLAY_IMAGE_SIDE), encoded once per
+    upload. `st.image` serves encoded bytes as-is, so reruns do not re-encode the photo.
+    """
+    with STAGE_METRICS.time('decode_display'):
+        return encode_jpeg(open_upload(_data, DISPLAY_IMAGE_SIDE), DISPLAY_IMAGE_SIDE)
+
+def thumbnail_data_uri(image, size=THUMBNAIL_SIZE):
+    return "data:image/jpeg;base64," + base64.b64encode(encode_jpeg(image, size, quality=80)).decode('ascii')
+
+def prepare_upload(data, preprocess=True):
     """
-    img = image.convert('RGB')
-    img = ImageOps.fit(img, (IMG_WIDTH, IMG_HEIGHT), Image.LANCZOS)
-    img_array = tf.keras.preprocessing.image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    return img_array
+    Decodes one file of a batch upload on the decode pool. Returns (img_array, thumbnail, preview):
+    the table thumbnail as a data URI and a BATCH_PREVIEW_SIDE JPEG that stands in for the upload
+    afterwards. img_array is None when `preprocess` is False (the prediction is already cached).
+    """
+    with STAGE_METRICS.time('decode'):
+        model_img = open_upload(data, DRAFT_OVERSAMPLE * max(IMG_WIDTH, IMG_HEIGHT))
+    img_array = None
+    if preprocess:
+        with STAGE_METRICS.time('preprocess'):
+            img_array = preprocess_image(model_img)
+    return img_array, thumbnail_data_uri(model_img), encode_jpeg(model_img, BATCH_PREVIEW_SIDE, quality=80)
+
+def classify_uploads(uploads, predict_fn, classes):
+    """
+    Classifies a batch upload, given as (name, bytes) pairs. Files are decoded on the
+    decode pool at most two chunks ahead of the main thread, which sends each chunk of
+    UPLOAD_CHUNK_SIZE images through `predict_fn` as one batch (cached predictions are
+    reused). Yields each chunk's result rows as soon as it is done; rows keep a preview
+    JPEG and the top-k predictions, not the uploaded bytes.
+    """
+    cache = get_prediction_cache()
+    keys = [prediction_cache_key(data) for _, data in uploads]
+    scores = [cache.get(key) for key in keys]
+    pool = get_decode_pool()
+    jobs = []
+
+    for start in range(0, len(uploads), UPLOAD_CHUNK_SIZE):
+        end = min(start + UPLOAD_CHUNK_SIZE, len(uploads))
+        for i in range(len(jobs), min(start + 2 * UPLOAD_CHUNK_SIZE, len(uploads))):
+            jobs.append(pool.submit(prepare_upload, uploads[i][1], scores[i] is None))
+
+        rows, pending = [], []
+        for i in range(start, end):
+            name = uploads[i][0]
+            row = {"name": name, "cache_key": keys[i], "thumbnail": None, "preview": None,
+                   "top_k": None, "error": None}
+            try:
+                img_array, row["thumbnail"], row["preview"] = jobs[i].result()
+            except Exception as e:
+                logger.warning(f"Batch upload: could not decode '{name}': {e}")
+                row["error"] = "Unreadable image"
+            else:
+                if img_array is not None:
+                    pending.append((i, img_array))
+            jobs[i] = None  # Release the decoded image
+            rows.append(row)
+
+        if pending:
+            with STAGE_METRICS.time('batch_predict'):
+                probs = predict_fn(np.concatenate([img_array for _, img_array in pending]))
+            for (i, _), score in zip(pending, probs):
+                scores[i] = score
+                cache.put(keys[i], score)
+
+        for i, row in zip(range(start, end), rows):
+            if row["error"] is None:
+                row["top_k"] = top_k_predictions(scores[i], classes)
+        yield rows
+
+@st.cache_resource
+def get_knowledge_store():
+    """
+    Loads the breed/diet JSON files once per process into an indexed store.
+    """
+    start = time.perf_counter()
+    store = BreedKnowledgeStore.load(
+        BREEDS_FILE_PATH, DIET_PLANS_FILE_PATH, CLASSES_FILE_PATH,
+        curated=BREED_KNOWLEDGE_BASE, fallback=FALLBACK_DATA, aliases=CURATED_ALIASES
+    )
+    logger.info(f"Knowledge store loaded in {(time.perf_counter() - start) * 1000:.0f} ms ({len(store.records)} breeds)")
+    return store
+
+@st.cache_resource
+def get_stage_metrics():
+    """
+    Process-wide stage histograms; starts the /metrics server and/or log thread when configured.
+    """
+    metrics = StageMetrics(enabled=bool(METRICS_PORT or METRICS_LOG_SECONDS))
+    if METRICS_PORT:
+        metrics.serve_metrics(METRICS_PORT)
+    if METRICS_LOG_SECONDS:
+        metrics.log_periodically(METRICS_LOG_SECONDS)
+    return metrics
+
+# Resolved once per script run; the hot paths below skip the cache_resource lookup.
+KNOWLEDGE_STORE = get_knowledge_store()
+CHAT_ENGINE = ChatEngine()
+STAGE_METRICS = get_stage_metrics()
+
+# Start the model loading in the background on the process's first script run,
+# so it overlaps with the user looking at the landing page.
+if st.runtime.exists():
+    get_model_loader()
 
 def lookup_breed_info(breed_name):
     """
-    Smart dictionary lookup.
+    O(1) lookup in the indexed knowledge store (any class/display name form).
     """
-    if breed_name in BREED_KNOWLEDGE_BASE:
-        return BREED_KNOWLEDGE_BASE[breed_name]
-    for key in BREED_KNOWLEDGE_BASE:
-        if key in breed_name or breed_name in key:
-            return BREED_KNOWLEDGE_BASE[key]
-    return FALLBACK_DATA
+    return KNOWLEDGE_STORE.lookup(breed_name)
 
 def generate_chat_response(breed_name, user_query):
     """
-    Rule-based NLP engine.
+    Rule-based NLP engine (compiled intent matcher over all knowledge fields).
     """
-    query = user_query.lower()
     info = lookup_breed_info(breed_name)
-    
-    if any(word in query for word in ["eat", "food", "diet", "feed", "hungry", "treats"]):
-        return f"🍖 **Dietary Advice:** {info['Diet']}"
-    elif any(word in query for word in ["origin", "from", "country", "history", "where"]):
-        return f"🌍 **Origin:** The {breed_name} originates from {info['Origin']}."
-    elif any(word in query for word in ["live", "life", "age", "years", "old", "die"]):
-        return f"⏳ **Lifespan:** The {breed_name} typically lives for {info['Life Span']}."
-    elif any(word in query for word in ["weather", "cold", "hot", "winter", "summer", "climate", "temp"]):
-        return f"☀️ **Climate Preference:** {info['Climate']}"
-    elif any(word in query for word in ["groom", "brush", "hair", "shed", "fur", "bath"]):
-        return f"🛁 **Grooming:** {info.get('Grooming', 'Regular brushing recommended.')}"
-    elif any(word in query for word in ["train", "sit", "stay", "behavior", "smart", "intelligent"]):
-        return f"🎓 **Training:** {info.get('Training', 'Positive reinforcement works best.')}"
-    elif any(word in query for word in ["big", "small", "size", "height", "weight", "tall"]):
-        return f"📏 **Size:** They typically stand {info.get('Height', 'Varies')} tall."
-    elif any(word in query for word in ["hello", "hi", "hey"]):
-        return f"Woof! I am your {breed_name} expert. Ask me about my diet, health, or history!"
-    else:
-        return f"That's an interesting question about the **{breed_name}**. While I specialize in their biology and care, generally speaking: {info['Bio']}"
+    weekday = WEEKDAYS[time.localtime().tm_wday]
+    return CHAT_ENGINE.respond(breed_name, user_query, info, weekday=weekday)
 
 # ==============================================================================
 # 5. STATE MANAGEMENT
@@ -496,18 +1149,68 @@ def generate_chat_response(breed_name, user_query):
 if 'page_view' not in st.session_state:
     st.session_state.page_view = 'LANDING'
 
-if 'analysis_data' not in st.session_state:
-    st.session_state.analysis_data = None
+# Everything else a session owns (analysis, chat, batch results) lives in the session
+# store under this id, so it is size-accounted and reclaimed after SESSION_TTL_SECONDS.
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+def session_data(key, default=None):
+    return get_session_store().get(st.session_state.session_id, key, default)
 
-if 'chat_messages' not in st.session_state:
-    st.session_state.chat_messages = []
+def set_session_data(key, value):
+    get_session_store().put(st.session_state.session_id, key, value)
+
+def add_chat_messages(messages):
+    """
+    Appends to the session's chat history. Beyond MAX_CHAT_MESSAGES the oldest messages
+    after the greeting are dropped (and counted, so the panel can say so).
+    """
+    chat = session_data('chat') or {"messages": [], "dropped": 0}
+    history = chat["messages"] + messages
+    excess = len(history) - MAX_CHAT_MESSAGES
+    if excess > 0:
+        history = history[:1] + history[1 + excess:]
+        chat["dropped"] += excess
+    chat["messages"] = history
+    set_session_data('chat', chat)
 
 def navigate_to_home():
     st.session_state.page_view = 'LANDING'
-    st.session_state.analysis_data = None
-    st.session_state.chat_messages = []
+    get_session_store().drop(st.session_state.session_id)
     st.rerun()
 
+def navigate_back():
+    """
+    Leaves the result view: back to the batch results table if it came from one, else home.
+    """
+    if session_data('batch') is None:
+        navigate_to_home()
+    else:
+        st.session_state.page_view = 'BATCH'
+        set_session_data('analysis', None)
+        set_session_data('chat', None)
+        st.rerun()
+
+def open_analysis(img, top_k, similar):
+    """
+    Switches to the result view for one analyzed photo. The session keeps only the
+    encoded photo (`img`: JPEG bytes), the top-k predictions and the similar dogs.
+    """
+    set_session_data('analysis', {
+        "image": img,
+        "top_k": top_k,
+        "similar": similar
+    })
+    
+    # Initial Greeting
+    breed_name, _ = top_match(top_k)
+    set_session_data('chat', {"messages": [{
+        "role": "bot", 
+        "content": f"Hello! I've identified this as a **{breed_name}**. I can help you with care tips, diet, and training advice. What would you like to know?"
+    }], "dropped": 0})
+    
+    st.session_state.page_view = 'RESULT'
+
 # ==============================================================================
 # 6. UI RENDERERS
 # ==============================================================================
@@ -532,9 +1235,10 @@ def render_landing_page():
     with col2:
         st.markdown("<div class='upload-container'>", unsafe_allow_html=True)
         st.markdown("<h3 style='margin-bottom: 10px;'>Analyze Dog Image</h3>", unsafe_allow_html=True)
-        st.markdown("<p style='font-size: 14px; color: #9CA3AF !important;'>Upload a clear JPEG or PNG image</p>", unsafe_allow_html=True)
+        st.markdown("<p style='font-size: 14px; color: #9CA3AF !important;'>Upload a clear JPEG or PNG image, or several to classify them in one batch</p>", unsafe_allow_html=True)
         
-        uploaded_file = st.file_uploader("", type=['jpg','png','jpeg'], label_visibility="collapsed")
+        uploaded_files = st.file_uploader("", type=['jpg','png','jpeg'], accept_multiple_files=True,
+                                          label_visibility="collapsed")
         st.markdown("</div>", unsafe_allow_html=True)
     
     # Features footer
@@ -544,15 +1248,14 @@ def render_landing_page():
     f2.info("**Instant Analysis**\n\nPowered by TensorFlow")
     f3.info("**Expert Chatbot**\n\nContext-aware advice")
 
-    return uploaded_file
+    return uploaded_files
 
 def render_result_dashboard():
     """
     Renders the Result View (Split Screen).
     """
-    data = st.session_state.analysis_data
-    breed = data['breed']
-    conf = data['conf']
+    data = session_data('analysis')
+    breed, conf = top_match(data['top_k'])
     img = data['image']
     info = lookup_breed_info(breed)
     
@@ -583,12 +1286,54 @@ def render_result_dashboard():
             
         st.markdown("</div>", unsafe_allow_html=True) # End Card
         
+        # Runner-up predictions (from the session's top-k)
+        runners_up = [f"{format_breed_name(name)} {100 * prob:.0f}%" for name, prob in data['top_k'][1:4] if prob >= 0.01]
+        if runners_up:
+            st.caption("Also possible: " + " · ".join(runners_up))
+        
+        # Similar Dogs (nearest training photos in embedding space)
+        similar = [s for s in data.get('similar') or [] if os.path.exists(s['path'])]
+        if similar:
+            st.markdown("**🐾 Similar Dogs**")
+            st.image([s['path'] for s in similar], width=110,
+                     caption=[f"{normalize_breed_name(s['label']).title()} · {s['score']:.0%}" for s in similar])
+        
+        # Weekly Diet Plan (precomputed per life stage in the knowledge store)
+        plan = info.get('diet_plan')
+        if plan:
+            with st.expander("🍖 Weekly Diet Plan"):
+                stages = [stage for stage in LIFE_STAGES if stage in plan]
+                stage = st.selectbox("Life stage", stages, index=stages.index('adult') if 'adult' in stages else 0,
+                                     format_func=str.title, key="diet_stage")
+                meals = plan[stage]
+                st.table({"Day": [day.title() for day in meals], "Meal": list(meals.values())})
+        
         st.markdown("<br>", unsafe_allow_html=True)
-        if st.button("⬅ Analyze Another"):
+        if session_data('batch') is not None:
+            if st.button("⬅ Back to Results"):
+                navigate_back()
+        elif st.button("⬅ Analyze Another"):
             navigate_to_home()
 
     # --- RIGHT: CHAT ---
     with right_col:
+        render_chat_panel(breed)
+
+def render_chat_message(msg):
+    bubble = 'bubble-user' if msg['role'] == 'user' else 'bubble-bot'
+    st.markdown(f"""
+        <div class='chat-row'>
+            <div class='bubble {bubble}'>{msg['content']}</div>
+        </div>
+    """, unsafe_allow_html=True)
+
+@st.fragment
+def render_chat_panel(breed):
+    """
+    Renders the chat panel as a fragment: a chat message reruns only this function,
+    not the whole script (stylesheet, photo, ID card and diet plan are left as they are).
+    """
+    with STAGE_METRICS.time('chat_panel'):
         st.markdown("<div class='chat-panel'>", unsafe_allow_html=True)
         
         # Chat Header
@@ -606,28 +1351,26 @@ def render_result_dashboard():
         chat_container = st.container(height=500)
         
         with chat_container:
-            for msg in st.session_state.chat_messages:
-                if msg['role'] == 'user':
-                    st.markdown(f"""
-                        <div class='chat-row'>
-                            <div class='bubble bubble-user'>{msg['content']}</div>
-                        </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                        <div class='chat-row'>
-                            <div class='bubble bubble-bot'>{msg['content']}</div>
-                        </div>
-                    """, unsafe_allow_html=True)
+            chat = session_data('chat') or {"messages": [], "dropped": 0}
+            dropped_note = st.empty()
+            for msg in chat["messages"]:
+                render_chat_message(msg)
         
         st.markdown("</div>", unsafe_allow_html=True) # End Panel
 
-        # Input
+        # Input (new bubbles are appended in place; no second rerun is needed)
         if prompt := st.chat_input(f"Ask about diet, grooming, etc..."):
-            st.session_state.chat_messages.append({"role": "user", "content": prompt})
-            response = generate_chat_response(breed, prompt)
-            st.session_state.chat_messages.append({"role": "bot", "content": response})
-            st.rerun()
+            new_messages = [{"role": "user", "content": prompt},
+                            {"role": "bot", "content": generate_chat_response(breed, prompt)}]
+            add_chat_messages(new_messages)
+            chat = session_data('chat')
+            with chat_container:
+                for msg in new_messages:
+                    render_chat_message(msg)
+
+        # Drawn last so the count includes anything this message just trimmed
+        if chat["dropped"]:
+            dropped_note.caption(f"{chat['dropped']} earlier messages were cleared to save memory.")
 
 def render_error_screen(conf):
     """
@@ -637,60 +1380,196 @@ def render_error_screen(conf):
     c1, c2, c3 = st.columns([1, 2, 1])
     with c2:
         st.error(f"Low Confidence ({conf:.1f}%). No known dog breed detected.")
-        if st.button("Try Again"):
-            navigate_to_home()
+        if st.button("Back to Results" if session_data('batch') is not None else "Try Again"):
+            navigate_back()
+
+def batch_table(rows):
+    """
+    Column data for the batch results table (one row per uploaded file).
+    """
+    def status(row):
+        if row['error']:
+            return row['error']
+        return "Match" if top_match(row['top_k'])[1] >= CONFIDENCE_THRESHOLD else "No dog detected"
+    matches = [top_match(row['top_k']) if row['error'] is None else (None, None) for row in rows]
+    return {
+        "Photo": [row['thumbnail'] for row in rows],
+        "File": [row['name'] for row in rows],
+        "Breed": [breed for breed, _ in matches],
+        "Confidence": [conf for _, conf in matches],
+        "Status": [status(row) for row in rows],
+    }
+
+BATCH_TABLE_COLUMNS = {
+    "Photo": st.column_config.ImageColumn("Photo", width="small"),
+    "Confidence": st.column_config.ProgressColumn("Confidence", format="%.1f%%", min_value=0, max_value=100),
+}
+
+def render_batch_progress(uploads, predict_fn, classes):
+    """
+    Classifies a batch upload, filling in a progress bar and the results table chunk by chunk.
+    Returns the result rows.
+    """
+    progress = st.progress(0.0, text=f"Analyzing {len(uploads)} images...")
+    table = st.empty()
+    rows = []
+    for chunk in classify_uploads(uploads, predict_fn, classes):
+        rows.extend(chunk)
+        progress.progress(len(rows) / len(uploads), text=f"Analyzed {len(rows)} of {len(uploads)} images")
+        table.dataframe(batch_table(rows), column_config=BATCH_TABLE_COLUMNS, hide_index=True,
+                        use_container_width=True)
+    return rows
+
+def render_batch_results():
+    """
+    Renders the sortable batch results table; selecting a row opens that photo's dashboard.
+    """
+    rows = session_data('batch')
+    matches = sum(1 for row in rows if row['error'] is None and top_match(row['top_k'])[1] >= CONFIDENCE_THRESHOLD)
+    unreadable = sum(1 for row in rows if row['error'])
+
+    st.markdown(f"""
+        <div style='margin-bottom: 10px;'>
+            <h2 style='margin:0;'>Batch Results</h2>
+            <p style='color: #6B7280;'>{len(rows)} photos · {matches} identified · {len(rows) - matches - unreadable} no dog detected · {unreadable} unreadable</p>
+        </div>
+    """, unsafe_allow_html=True)
+    st.caption("Click a column header to sort. Select a row to open its breed profile and chat.")
+
+    event = st.dataframe(batch_table(rows), column_config=BATCH_TABLE_COLUMNS, hide_index=True,
+                         use_container_width=True, on_select="rerun", selection_mode="single-row",
+                         key="batch_table")
+    if event.selection.rows:
+        row = rows[event.selection.rows[0]]
+        if row['error']:
+            st.warning(f"'{row['name']}' could not be read as an image.")
+        else:
+            # The preview JPEG stands in for the upload, which the session no longer holds.
+            confident = top_match(row['top_k'])[1] >= CONFIDENCE_THRESHOLD
+            similar = find_similar_dogs(row['preview'], row['cache_key']) if confident else None
+            open_analysis(row['preview'], row['top_k'], similar)
+            st.rerun()
+
+    if st.button("⬅ Analyze More"):
+        navigate_to_home()
+
+def render_memory_view():
+    """
+    Memory accounting (?view=memory, enabled by PAWIDENTIFY_MEMORY_VIEW=1): session-store bytes
+    per session and in total, next to the process RSS and the shared caches.
+    """
+    store = get_session_store()
+    usage = store.usage()
+    total = sum(sum(sizes.values()) for _, sizes, _ in usage)
+    rss = process_rss()
+
+    st.markdown("<h2 style='margin-bottom: 0;'>Memory</h2>", unsafe_allow_html=True)
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Sessions", len(usage))
+    c2.metric("Session data", f"{total / 1e6:.2f} MB")
+    c3.metric("Per session (mean)", f"{total / len(usage) / 1e3:.1f} KB" if usage else "—")
+    c4.metric("Process RSS", f"{rss / 1e6:.0f} MB" if rss else "n/a")
+
+    predictions = get_prediction_cache().stats()
+    similar = get_similarity_cache().stats()
+    st.caption(
+        f"Shared across sessions: {predictions['entries']}/{predictions['max_size']} cached predictions, "
+        f"{similar['entries']} cached similar-dog lists, up to {DISPLAY_CACHE_SIZE} encoded dashboard photos. "
+        f"Sessions idle for {SESSION_TTL_SECONDS / 60:.0f} min are reclaimed ({store.reclaimed} so far); "
+        f"chat history is capped at {MAX_CHAT_MESSAGES} messages."
+    )
+    keys = ('analysis', 'chat', 'batch')
+    st.dataframe({
+        "Session": [sid[:8] for sid, _, _ in usage],
+        **{f"{key.title()} KB": [sizes.get(key, 0) / 1e3 for _, sizes, _ in usage] for key in keys},
+        "Total KB": [sum(sizes.values()) / 1e3 for _, sizes, _ in usage],
+        "Idle (s)": [round(idle) for _, _, idle in usage],
+    }, hide_index=True, use_container_width=True)
 
 # ==============================================================================
 # 7. MAIN EXECUTION
 # ==============================================================================
 
 def main():
+    if MEMORY_VIEW and st.query_params.get('view') == 'memory':
+        render_memory_view()
+        return
+
+    # A session idle for longer than the TTL has had its data reclaimed; start over.
+    needed = {'RESULT': 'analysis', 'BATCH': 'batch'}.get(st.session_state.page_view)
+    if needed and session_data(needed) is None:
+        st.session_state.page_view = 'LANDING'
+        st.info(f"Your previous results were cleared after {SESSION_TTL_SECONDS / 60:.0f} minutes of inactivity.")
+
     if st.session_state.page_view == 'LANDING':
-        file = render_landing_page()
+        with STAGE_METRICS.time('render'):
+            files = render_landing_page()
         
-        if file:
+        if len(files) == 1:
+            file = files[0]
             with st.spinner("Analyzing image..."):
+                start = time.perf_counter()
                 # Load Resources
-                model, classes = load_model_engine()
+                predict_fn, classes = load_model_engine()
                 
-                if not model:
+                if not predict_fn:
                     st.error("Model file not found. Please check setup.")
                     st.stop()
                 
-                # Predict
-                img = Image.open(file).convert('RGB')
-                img_array = preprocess_image(img)
-                preds = model.predict(img_array)
-                score = preds[0]
-                top_idx = np.argmax(score)
-                conf = 100 * np.max(score)
-                
-                # Format Name
-                raw_name = classes[top_idx]
-                breed_name = raw_name.split('-', 1)[1].replace('_', ' ').title() if '-' in raw_name else raw_name
-                
-                # Store State
-                st.session_state.analysis_data = {
-                    "image": img,
-                    "breed": breed_name,
-                    "conf": conf
-                }
-                
-                # Initial Greeting
-                st.session_state.chat_messages = [{
-                    "role": "bot", 
-                    "content": f"Hello! I've identified this as a **{breed_name}**. I can help you with care tips, diet, and training advice. What would you like to know?"
-                }]
+                # Predict (re-uploads of the same photo are served from the cache)
+                data = file.getvalue()
+                cache = get_prediction_cache()
+                cache_key = prediction_cache_key(data)
+                img = get_display_image(cache_key, data)
+                score = cache.get(cache_key)
+                img_array = None
+                if score is None:
+                    with STAGE_METRICS.time('decode'):
+                        model_img = open_upload(data, DRAFT_OVERSAMPLE * max(IMG_WIDTH, IMG_HEIGHT))
+                    with STAGE_METRICS.time('preprocess'):
+                        img_array = preprocess_image(model_img)
+                    with STAGE_METRICS.time('predict'):
+                        score = predict_fn(img_array)[0]
+                    cache.put(cache_key, score)
+                top_k = top_k_predictions(score, classes)
+                conf = top_match(top_k)[1]
+                similar = find_similar_dogs(data, cache_key, img_array) if conf >= CONFIDENCE_THRESHOLD else None
                 
-                st.session_state.page_view = 'RESULT'
+                open_analysis(img, top_k, similar)
+                record_latency(time.perf_counter() - start)
                 st.rerun()
 
+        elif files:
+            if len(files) > MAX_UPLOAD_FILES:
+                st.warning(f"Only the first {MAX_UPLOAD_FILES} of {len(files)} photos are analyzed.")
+            start = time.perf_counter()
+            predict_fn, classes = load_model_engine()
+            if not predict_fn:
+                st.error("Model file not found. Please check setup.")
+                st.stop()
+
+            uploads = [(file.name, file.getvalue()) for file in files[:MAX_UPLOAD_FILES]]
+            rows = render_batch_progress(uploads, predict_fn, classes)
+            seconds = time.perf_counter() - start
+            logger.info(f"Batch analysis of {len(rows)} images took {seconds * 1000:.0f} ms "
+                        f"({len(rows) / seconds:.1f} images/s)")
+
+            set_session_data('batch', rows)
+            st.session_state.page_view = 'BATCH'
+            st.rerun()
+
+    elif st.session_state.page_view == 'BATCH':
+        with STAGE_METRICS.time('render'):
+            render_batch_results()
+
     elif st.session_state.page_view == 'RESULT':
-        conf = st.session_state.analysis_data['conf']
-        if conf < CONFIDENCE_THRESHOLD:
-            render_error_screen(conf)
-        else:
-            render_result_dashboard()
+        conf = top_match(session_data('analysis')['top_k'])[1]
+        with STAGE_METRICS.time('render'):
+            if conf < CONFIDENCE_THRESHOLD:
+                render_error_screen(conf)
+            else:
+                render_result_dashboard()
 
 if __name__ == '__main__':
-    main()
+    with STAGE_METRICS.time('script_run'):
+        main()
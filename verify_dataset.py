@@ -0,0 +1,63 @@
+"""
+verify_dataset.py
+
+Dataset checker for the Dog Breed Classifier.
+Features:
+- Cross-checks labels.csv ids against train/*.jpg in both directions.
+- Decodes every image on a thread pool and records dimensions, a content hash and
+  any decode error in an incremental manifest (only new or changed files are re-decoded).
+- Lists corrupt images and duplicate contents, and can write the corrupt paths to a file.
+"""
+
+from pathlib import Path
+import argparse
+
+from dog_breed_classifier import read_labels, verify_images
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--root', default='.', help="Directory containing labels.csv and train/")
+    parser.add_argument('--manifest', default=None, help="Verification manifest (default: <root>/dataset_manifest.json)")
+    parser.add_argument('--workers', type=int, default=None, help="Decode threads (default: all cores)")
+    parser.add_argument('--skip_decode', action='store_true', help="Only cross-check ids, do not decode images")
+    parser.add_argument('--bad_list', default=None, help="Write the paths of corrupt images here, one per line")
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    ids, _ = read_labels(root / 'labels.csv')
+    train_files = {p.stem: str(p) for p in (root / 'train').glob('*.jpg')}
+    label_ids = set(ids)
+
+    print(f"labels.csv entries: {len(ids)}")
+    print(f"train images: {len(train_files)}")
+    print(f"Missing in `train/`: {len(label_ids - train_files.keys())}")
+    print(f"Missing in `labels.csv`: {len(train_files.keys() - label_ids)}")
+    if args.skip_decode:
+        return
+
+    paths = sorted(train_files.values())
+    entries = verify_images(paths, Path(args.manifest or root / 'dataset_manifest.json'), args.workers)
+    bad = [p for p in paths if entries[p]['error']]
+    by_hash = {}
+    for path in paths:
+        if entries[path]['sha1']:
+            by_hash.setdefault(entries[path]['sha1'], []).append(path)
+    duplicates = [group for group in by_hash.values() if len(group) > 1]
+    sizes = [(entries[p]['width'], entries[p]['height']) for p in paths if not entries[p]['error']]
+
+    print(f"Corrupt images: {len(bad)}")
+    for path in bad:
+        print(f"  {path}: {entries[path]['error']}")
+    print(f"Duplicate contents: {sum(len(g) - 1 for g in duplicates)} file(s) in {len(duplicates)} group(s)")
+    for group in duplicates[:10]:
+        print(f"  {', '.join(group)}")
+    if sizes:
+        print(f"Smallest image: {min(sizes, key=lambda s: s[0] * s[1])}, largest: {max(sizes, key=lambda s: s[0] * s[1])}")
+    if args.bad_list:
+        Path(args.bad_list).write_text(''.join(f"{p}\n" for p in bad))
+        print(f"✓ Wrote {len(bad)} path(s) to '{args.bad_list}'.")
+
+
+if __name__ == '__main__':
+    main()